@@ -1,16 +1,23 @@
 """
 LINE Delivery Adapter (requests)
 - broadcast_text(message, token=None)
+- LineDelivery(access_token, secret): client ที่ถือ requests.Session ไว้ใช้ซ้ำ
+  (push_text / broadcast_text / push_messages / broadcast_messages)
 """
 from __future__ import annotations
 
+import json
 import os
+import uuid
 from typing import Dict, Any, Tuple, Optional
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-__all__ = ["broadcast_text"]
+__all__ = ["broadcast_text", "LineDelivery"]
 
 LINE_API_BASE = "https://api.line.me"
+LINE_MAX_MESSAGES = 5  # LINE รับได้สูงสุด 5 ข้อความต่อ request
 
 # [PATCH] app/adapters/delivery_line.py (แทนที่ _post ทั้งฟังก์ชัน)
 def _post(path: str, body: Dict[str, Any], token: str) -> Tuple[int, str]:
@@ -42,6 +49,92 @@ def broadcast_text(message: str, token: Optional[str] = None) -> Tuple[int, str]
     body = {"messages": [{"type": "text", "text": text}]}
     return _post("/v2/bot/message/broadcast", body, tok)
 
+# =============================================================================
+# Client (session เดียว ใช้ซ้ำข้ามหลายการส่ง → TLS/keep-alive ไม่ต้อง handshake ใหม่)
+# =============================================================================
+class LineDelivery:
+    """
+    LINE Messaging API client แบบถือ session ไว้
+    - push_text(to, text) / broadcast_text(text) → {"ok": bool, "status": int, "error": str}
+    - retry 3 ครั้ง (exponential backoff 0.5s→สูงสุด 5s, เคารพ Retry-After) สำหรับ 429/5xx
+      แนบ X-Line-Retry-Key กันข้อความซ้ำตอน retry
+    """
+
+    def __init__(self, access_token: str, secret: Optional[str] = None, timeout: float = 5.0):
+        self.access_token = (access_token or "").strip()
+        self.secret = secret
+        self.timeout = timeout
+        self._s: Optional[requests.Session] = None
+
+    def _session(self) -> requests.Session:
+        if self._s is None:
+            s = requests.Session()
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                backoff_max=5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+            )
+            s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+            s.headers.update({
+                "Content-Type": "application/json; charset=utf-8",
+                "Authorization": f"Bearer {self.access_token}",
+            })
+            self._s = s
+        return self._s
+
+    def _send(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            resp = self._session().post(
+                f"{LINE_API_BASE}{path}",
+                data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+                headers={"X-Line-Retry-Key": str(uuid.uuid4())},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            return {"ok": False, "status": 0, "error": f"RequestsError: {e}"}
+        ok = 200 <= resp.status_code < 300
+        return {"ok": ok, "status": resp.status_code, "error": "" if ok else resp.text[:500]}
+
+    @staticmethod
+    def _messages(text: str) -> list:
+        return [{"type": "text", "text": (text or "").strip()[:5000]}]
+
+    @classmethod
+    def _chunks(cls, texts) -> list:
+        msgs = [m for t in texts if (t or "").strip() for m in cls._messages(t)]
+        return [msgs[i:i + LINE_MAX_MESSAGES] for i in range(0, len(msgs), LINE_MAX_MESSAGES)]
+
+    def _send_many(self, path: str, texts, to: Optional[str] = None) -> Dict[str, Any]:
+        """ส่งหลายข้อความ รวมทีละ 5 ต่อ request; คืนผลของ request แรกที่ล้ม (หรือตัวสุดท้าย)"""
+        res: Dict[str, Any] = {"ok": True, "status": 0, "error": "no messages"}
+        for chunk in self._chunks(texts):
+            body: Dict[str, Any] = {"messages": chunk}
+            if to:
+                body["to"] = to
+            res = self._send(path, body)
+            if not res["ok"]:
+                break
+        return res
+
+    def push_messages(self, to: str, texts) -> Dict[str, Any]:
+        return self._send_many("/v2/bot/message/push", texts, to=to)
+
+    def broadcast_messages(self, texts) -> Dict[str, Any]:
+        return self._send_many("/v2/bot/message/broadcast", texts)
+
+    def push_text(self, to: str, text: str) -> Dict[str, Any]:
+        return self._send("/v2/bot/message/push", {"to": to, "messages": self._messages(text)})
+
+    def broadcast_text(self, text: str) -> Dict[str, Any]:
+        return self._send("/v2/bot/message/broadcast", {"messages": self._messages(text)})
+
+    def close(self) -> None:
+        if self._s is not None:
+            self._s.close()
+            self._s = None
+
 # =============================================================================
 # Broadcast helper (stub)
 # =============================================================================
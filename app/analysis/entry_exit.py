@@ -126,7 +126,7 @@ def suggest_trade(
 
     # -- Load timeframe data ---------------------------------------------------
     if df is None:
-        df = get_data(symbol, tf, xlsx_path=cfg.get("xlsx_path"))
+        df = get_data(symbol, tf, xlsx_path=cfg.get("xlsx_path"), parquet_path=cfg.get("parquet_path"))
 
     # -- Analyze current TF ----------------------------------------------------
     sc_1d = analyze_scenarios(df, symbol=symbol, tf=tf, cfg=cfg)
@@ -142,7 +142,7 @@ def suggest_trade(
 
     # -- Weekly context --------------------------------------------------------
     try:
-        df_1w = get_data(symbol, "1W", xlsx_path=cfg.get("xlsx_path"))
+        df_1w = get_data(symbol, "1W", xlsx_path=cfg.get("xlsx_path"), parquet_path=cfg.get("parquet_path"))
         sc_1w = analyze_scenarios(df_1w, symbol=symbol, tf="1W", cfg=cfg)
         weekly_bias = (sc_1w.get("bias") or sc_1w.get("trend") or direction).upper()
     except Exception:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import csv
 import os
 import re
 import math
@@ -10,9 +11,17 @@ from typing import Literal, Optional, Sequence, List, Tuple, Dict
 import pandas as pd
 import pathlib
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except Exception:  # optional: ไม่มี pyarrow → ใช้ pandas.read_csv
+    pa = None
+    pacsv = None
+
 # ---- Public API ----
 __all__ = [
     "get_data",
+    "read_excel_cached",
     "SUPPORTED_TF",
     "RequiredColumnsMissing",
     # สำหรับ worker/health (เรียกใช้เมื่อจำเป็นเท่านั้น)
@@ -193,6 +202,31 @@ def _read_excel_strict(
     return df.loc[:, list(REQUIRED_COLUMNS)]
 
 
+# ---- Parquet helpers ----
+def _read_parquet_strict(parquet_path: str, symbol: str, tf: str) -> pd.DataFrame:
+    """
+    อ่าน OHLCV จาก Parquet dataset ที่แบ่ง partition ด้วยคอลัมน์ 'sheet'
+    (เช่น historical.parquet/sheet=BTCUSDT_1D/...) อ่านเฉพาะ partition ที่ต้องการ
+    """
+    if not parquet_path or not os.path.exists(parquet_path):
+        raise FileNotFoundError(f"Parquet not found: {parquet_path}")
+
+    sheet = _sheet_name(symbol, tf)
+    raw = pd.read_parquet(
+        parquet_path,
+        engine="pyarrow",
+        columns=list(REQUIRED_COLUMNS),
+        filters=[("sheet", "==", sheet)],
+    )
+    if raw.empty:
+        raise ValueError(f"Partition '{sheet}' not found in {parquet_path}")
+
+    df = _ensure_required_columns(raw, f"Partition '{sheet}' in {parquet_path}")
+    df = _parse_and_clean_strict(df)
+    _validate_monotonic(df, f"Partition '{sheet}'")
+    return df.loc[:, list(REQUIRED_COLUMNS)]
+
+
 # ---- CSV helpers ----
 def _csv_candidates(symbol: str, tf: str) -> List[str]:
     """
@@ -206,13 +240,106 @@ def _csv_candidates(symbol: str, tf: str) -> List[str]:
     root_data = (base.parent.parent / "data" / fname).resolve()
     return [str(app_data), str(root_data)]
 
+def _parquet_sibling(csv_path: str) -> Optional[str]:
+    """
+    คืน <name>.parquet ข้าง ๆ CSV ถ้ามีและไม่เก่ากว่า CSV (cache ที่ jobs quick-fill เขียนไว้)
+    """
+    pq = os.path.splitext(csv_path)[0] + ".parquet"
+    if not os.path.exists(pq):
+        return None
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(pq):
+        return None
+    return pq
+
+def _first_sheet_name(xlsx_path: str) -> str:
+    """ชื่อชีทแรก (openpyxl read_only อ่านแค่ workbook.xml ไม่ parse ข้อมูลชีท)"""
+    from openpyxl import load_workbook
+    wb = load_workbook(xlsx_path, read_only=True)
+    try:
+        return wb.sheetnames[0]
+    finally:
+        wb.close()
+
+def _dir_mtime(path: str) -> float:
+    files = [os.path.join(path, f) for f in os.listdir(path)] if os.path.isdir(path) else []
+    return max((os.path.getmtime(f) for f in files), default=0.0)
+
+def _xlsx_cache_root(xlsx_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(xlsx_path))[0]
+    return os.path.join(os.path.dirname(xlsx_path), ".xlsx_cache", stem)
+
+def read_excel_cached(
+    xlsx_path: str = DATA_PATH_DEFAULT,
+    sheet_name: str | int = 0,
+    parquet_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    อ่านชีทจาก xlsx ผ่าน cache Parquet (partition ตามชื่อชีท)
+    - partition ใหม่กว่า xlsx → อ่าน Parquet ตรง ๆ
+    - ไม่มี/เก่ากว่า → อ่าน Excel ครั้งเดียวแล้วเขียน partition ทับไว้ใช้รอบหน้า
+    cache อยู่ที่ <โฟลเดอร์ xlsx>/.xlsx_cache/<ชื่อไฟล์>/ แยกจาก historical.parquet
+    (dataset หลักที่ jobs/daily_btc_analysis.py เขียน → ห้ามปนกัน)
+    """
+    root = parquet_path or _xlsx_cache_root(xlsx_path)
+    sheet = _first_sheet_name(xlsx_path) if isinstance(sheet_name, int) else sheet_name
+    part = os.path.join(root, f"sheet={sheet}")
+
+    if os.path.isdir(part) and _dir_mtime(part) >= os.path.getmtime(xlsx_path):
+        return pd.read_parquet(part, engine="pyarrow")
+
+    df = pd.read_excel(xlsx_path, sheet_name=sheet)
+    try:
+        df.assign(sheet=sheet).to_parquet(
+            root,
+            engine="pyarrow",
+            compression="zstd",
+            index=False,
+            partition_cols=["sheet"],
+            existing_data_behavior="delete_matching",
+        )
+    except Exception:
+        pass  # cache เขียนไม่ได้ (เช่น read-only FS) → ยังคืนข้อมูลจาก Excel ได้
+    return df
+
+def _read_csv_fast(path: str) -> pd.DataFrame:
+    """
+    อ่าน CSV ด้วย pyarrow.csv (multi-thread, ระบุ type ล่วงหน้า) ถ้ามี; ไม่งั้นใช้ pandas
+    - คอลัมน์เวลา (timestamp/date) อ่านเป็น string เสมอ ให้ _parse_and_clean_strict ตีความต่อ
+      (รักษากติกา naive = เวลากรุงเทพ และ epoch ตัวเลขแบบเดิม)
+    - OHLCV อ่านเป็น float64 ตรง ๆ
+    """
+    if pacsv is None:
+        return pd.read_csv(path)
+    # parse header ด้วย csv module (รองรับชื่อคอลัมน์ที่มี "..." ครอบ) แล้วส่งชื่อให้ pyarrow ตรง ๆ
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+    types = {}
+    for name in header:
+        key = name.strip().lower()
+        if key in ("timestamp", "date"):
+            types[name] = pa.string()
+        elif key in ("open", "high", "low", "close", "volume"):
+            types[name] = pa.float64()
+    table = pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=32 << 20, column_names=header, skip_rows=1),
+        convert_options=pacsv.ConvertOptions(column_types=types),
+    )
+    return table.to_pandas()
+
 def _read_csv_strict(symbol: str, tf: str) -> pd.DataFrame:
     candidates = _csv_candidates(symbol, tf)
-    path = next((p for p in candidates if os.path.exists(p)), None)
+    path = next((p for p in candidates if os.path.exists(p) or _parquet_sibling(p)), None)
     if path is None:
         raise FileNotFoundError(f"CSV not found. Tried: {candidates}")
 
-    raw = pd.read_csv(path)
+    pq = _parquet_sibling(path)
+    if pq is not None:
+        # typed/columnar → อ่านเฉพาะคอลัมน์ที่ใช้ ไม่ต้อง parse ข้อความ
+        path = pq
+        raw = pd.read_parquet(pq, engine="pyarrow", columns=list(REQUIRED_COLUMNS))
+    else:
+        raw = _read_csv_fast(path)
     # ทำให้ column name lower-case เพื่อ map ง่าย
     raw.columns = [str(c).lower() for c in raw.columns]
     if "timestamp" not in raw.columns and "date" in raw.columns:
@@ -328,12 +455,13 @@ def get_data(
     *,
     xlsx_path: Optional[str] = None,
     engine: str = "openpyxl",
+    parquet_path: Optional[str] = None,
 ) -> pd.DataFrame:
     """
     Load OHLCV data.
 
     Modes:
-      - Default (REALTIME != '1'): Excel/CSV → (for 1W) resample from 1D
+      - Default (REALTIME != '1'): Parquet (ถ้าระบุ parquet_path) → Excel/CSV → (for 1W) resample from 1D
       - Real-time (REALTIME == '1'): Provider chain (e.g., Binance). If all providers fail → fallback to files.
 
     Returns DataFrame with columns: timestamp(UTC, tz-aware), open, high, low, close, volume
@@ -354,6 +482,11 @@ def get_data(
     path = xlsx_path or DATA_PATH_DEFAULT
 
     def _try_excel(sym: str, tf_: str) -> pd.DataFrame | None:
+        if parquet_path:
+            try:
+                return _read_parquet_strict(parquet_path, sym, tf_)
+            except Exception:
+                pass
         try:
             return _read_excel_strict(path, sym, tf_, engine=engine)
         except Exception:
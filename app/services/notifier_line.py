@@ -1,6 +1,7 @@
 from __future__ import annotations
 import os
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
 
 try:
     # ใช้ตัวส่งจริงที่เพิ่งเพิ่มไว้
@@ -8,7 +9,12 @@ try:
 except Exception:
     line_broadcast_text = None  # ป้องกัน import error
 
-__all__ = ["get_notifier", "LineNotifier"]
+try:
+    from app.adapters.delivery_line import LineDelivery
+except Exception:
+    LineDelivery = None
+
+__all__ = ["get_notifier", "LineNotifier", "send_message", "send_messages"]
 
 
 class LineNotifier:
@@ -49,3 +55,34 @@ class LineNotifier:
 def get_notifier() -> LineNotifier:
     token = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "").strip() or None
     return LineNotifier(token)
+
+
+# =============================================================================
+# Module-level sender (ใช้ client/session เดียวทั้งโปรเซส)
+# =============================================================================
+@lru_cache(maxsize=4)
+def _client(token: str):
+    return LineDelivery(token)
+
+def send_messages(msgs: Iterable[str]) -> Tuple[bool, str]:
+    """
+    ส่งหลายข้อความในครั้งเดียว (LINE รับ 5 ข้อความต่อ request)
+    - มี LINE_TO / LINE_USER_ID → push หาปลายทางนั้น, ไม่มี → broadcast
+    - ไม่มี token หรือ adapter → Dummy (print อย่างเดียว)
+    """
+    msgs = [m for m in msgs if m and m.strip()]
+    if not msgs:
+        return False, "empty message"
+    token = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "").strip()
+    if not token or LineDelivery is None:
+        for m in msgs:
+            print(f"[DUMMY LINE] {m}")
+        return True, f"DUMMY send: {len(msgs)} message(s)"
+
+    to = (os.getenv("LINE_TO") or os.getenv("LINE_USER_ID") or "").strip()
+    client = _client(token)
+    res = client.push_messages(to, msgs) if to else client.broadcast_messages(msgs)
+    return res["ok"], f"LINE status={res['status']} {res['error']}".strip()
+
+def send_message(text: str) -> Tuple[bool, str]:
+    return send_messages([text])
@@ -1,10 +1,16 @@
 # app/services/price_provider_binance.py
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, Iterable, Optional
+import json
 import re
 import os
 import requests
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
 import pandas as pd
 
 __all__ = [
@@ -13,6 +19,7 @@ __all__ = [
     "get_spot_ccxt",
     "get_spot_text_ccxt",
     "get_price",
+    "get_price_many",
 ]
 
 # ---- Map TF ----
@@ -213,3 +220,42 @@ def get_price(symbol: str = "BTCUSDT", *, timeout_sec: Optional[float] = 10.0) -
         except Exception as e:
             raise RuntimeError(f"fetch price failed for {symbol}: {e}")
     return float(px)
+
+# ---- Public: get_price_many (หลาย symbol ใน request เดียว) ----
+async def get_price_many(
+    symbols: Iterable[str],
+    *,
+    timeout_sec: Optional[float] = 10.0,
+    session: "aiohttp.ClientSession | None" = None,
+) -> Dict[str, float]:
+    """
+    คืน {BINANCE_SYMBOL: price} ด้วย GET /api/v3/ticker/price?symbols=[...] ครั้งเดียว
+    - หมุน endpoint เหมือน _rest_get_price
+    - ส่ง session มาเองเพื่อใช้ connection ซ้ำข้ามรอบได้ (ไม่ส่ง → เปิดชั่วคราว)
+    """
+    if aiohttp is None:
+        raise RuntimeError("aiohttp not available")
+    syms = sorted({_to_binance_symbol(s) for s in symbols if s})
+    if not syms:
+        return {}
+    params = {"symbols": json.dumps(syms, separators=(",", ":"))}
+    timeout = aiohttp.ClientTimeout(total=max(3, int(timeout_sec or 10)))
+
+    own = session is None
+    if own:
+        session = aiohttp.ClientSession(timeout=timeout)
+    try:
+        last_err: Optional[Exception] = None
+        for base in _BINANCE_BASES:
+            try:
+                async with session.get(f"{base}/api/v3/ticker/price", params=params, timeout=timeout) as r:
+                    r.raise_for_status()
+                    data = await r.json()
+                return {d["symbol"]: float(d["price"]) for d in data}
+            except Exception as e:
+                last_err = e
+                continue
+        raise RuntimeError(f"REST batch price failed via all endpoints: {last_err}")
+    finally:
+        if own:
+            await session.close()
@@ -12,6 +12,8 @@ import csv
 import datetime
 from typing import List, Dict, Any, Optional
 
+import numpy as np
+
 # =============================================================================
 # CONFIG LAYER
 # =============================================================================
@@ -91,6 +93,35 @@ def list_trade_plans(open_only: bool = False) -> List[Dict[str, Any]]:
         rows = [r for r in rows if not r.get("closed_at")]
     return rows
 
+def _to_float(v: Any) -> float:
+    try:
+        return float(v) if v not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def snapshot_arrays(open_only: bool = True) -> Dict[str, np.ndarray]:
+    """
+    คืน trade plans แบบ columnar (1 array ต่อ field) สำหรับประเมินทุกแผนพร้อมกันด้วย NumPy
+    - timestamp/symbol: object array
+    - entry/tp1/tp2/tp3/sl: float64 (ค่าว่าง → 0)
+    - direction_sign: int8 (LONG=1, SHORT=-1, อื่นๆ=0)
+    - tp1_hit/tp2_hit/tp3_hit/sl_hit: bool
+    """
+    rows = list_trade_plans(open_only=open_only)
+    out: Dict[str, np.ndarray] = {
+        "timestamp": np.array([r.get("timestamp", "") for r in rows], dtype=object),
+        "symbol": np.array([r.get("symbol", "") for r in rows], dtype=object),
+    }
+    for f in ("entry", "tp1", "tp2", "tp3", "sl"):
+        out[f] = np.array([_to_float(r.get(f)) for r in rows], dtype=np.float64)
+    sign = {"LONG": 1, "SHORT": -1}
+    out["direction_sign"] = np.array(
+        [sign.get((r.get("direction") or "").upper(), 0) for r in rows], dtype=np.int8
+    )
+    for t in ("tp1", "tp2", "tp3", "sl"):
+        out[f"{t}_hit"] = np.array([bool(r.get(f"{t}_hit")) for r in rows], dtype=bool)
+    return out
+
 def mark_closed(timestamp: str, reason: str) -> bool:
     """
     ปิดแผนเทรดตาม timestamp และใส่ closed_at
@@ -203,27 +203,37 @@ def analyze_wave(
     *,
     xlsx_path: Optional[str] = "app/data/historical.xlsx",
     cfg: Optional[Dict[str, Any]] = None,
+    parquet_path: Optional[str] = None,
+    df: Optional[pd.DataFrame] = None,
 ) -> Dict[str, Any]:
     """
     End-to-end analysis:
+      - หากส่ง df มา: ใช้ DataFrame นั้นเลย (ไม่อ่านไฟล์ซ้ำ)
       - หาก cfg['use_live'] เป็น True: โหลด OHLCV จาก Binance (ผ่าน price_provider)
-      - ไม่เช่นนั้น: โหลดจาก Excel/CSV (ผ่าน timeframes.get_data)
+      - ไม่เช่นนั้น: โหลดจาก Parquet/Excel/CSV (ผ่าน timeframes.get_data)
       - Run scenarios (+ optional Weekly context)
       - แนบ Elliott (RULES + FRACTAL bundle)
       - แนบ TP/SL (3%,5%,7% / SL 3%) และ metadata พื้นฐาน
     """
     cfg = cfg or {}
+    # ส่ง parquet_path ต่อเฉพาะเมื่อระบุ (คง signature เดิมของ get_data สำหรับผู้เรียกอื่น)
+    load_kw: Dict[str, Any] = {"xlsx_path": xlsx_path}
+    if parquet_path:
+        load_kw["parquet_path"] = parquet_path
 
-    # 1) Load main TF data (live หรือ file)
+    # 1) Load main TF data (in-memory, live หรือ file)
     try:
-        if cfg.get("use_live"):
+        if df is not None:
+            if df.empty:
+                return _neutral_payload(symbol, tf)
+        elif cfg.get("use_live"):
             limit = int(cfg.get("live_limit", 500))
             pair = _to_pair(symbol)
             df: pd.DataFrame = get_ohlcv_ccxt_safe(pair, tf, limit)
             if df is None or df.empty:
                 return _neutral_payload(symbol, tf, err=RuntimeError("no live OHLCV"))
         else:
-            df: pd.DataFrame = get_data(symbol, tf, xlsx_path=xlsx_path)
+            df: pd.DataFrame = get_data(symbol, tf, **load_kw)
             if df is None or df.empty:
                 return _neutral_payload(symbol, tf)
     except Exception as e:
@@ -240,7 +250,7 @@ def analyze_wave(
         if cfg.get("use_live"):
             wdf = get_ohlcv_ccxt_safe(_to_pair(symbol), "1W", int(cfg.get("live_limit", 500)))
         else:
-            wdf = get_data(symbol, "1W", xlsx_path=xlsx_path)
+            wdf = get_data(symbol, "1W", **load_kw)
         if wdf is not None and not wdf.empty:
             weekly_ctx = classify_elliott_with_kind(wdf, timeframe="1W")
             weekly_bias = ((weekly_ctx or {}).get("current") or {}).get("weekly_bias") \
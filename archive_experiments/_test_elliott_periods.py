@@ -1,5 +1,6 @@
 # scripts/test_elliott_periods_runner.py
 import sys, os
+import numpy as np
 import pandas as pd
 
 # ให้ Python เห็น root project
@@ -52,6 +53,9 @@ def load_df(path: str) -> pd.DataFrame:
 
     # แปลงเป็น datetime
     df["date"] = pd.to_datetime(df[date_col], errors="coerce")
+    # OHLCV เป็น float64 ครั้งเดียวตอนโหลด → ทุก slice/detector ไม่ต้องแปลง dtype ซ้ำ
+    num_cols = [c for c in ("open", "high", "low", "close", "volume") if c in df.columns]
+    df[num_cols] = df[num_cols].astype(np.float64, copy=False)
     return df.sort_values("date").reset_index(drop=True)
 
 def slice_with_context(df, start, end):
@@ -60,6 +64,7 @@ def slice_with_context(df, start, end):
     return df[(df["date"]>=start)&(df["date"]<=end)].copy()
 
 def run_detector(df_test):
+    # ส่ง slice เดิมทั้งก้อน (คอลัมน์ครบ; OHLCV เป็น float64 ตั้งแต่ load_df แล้ว)
     if callable(logic_classify):
         try:
             return logic_classify(df_test)
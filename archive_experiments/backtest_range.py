@@ -1,16 +1,44 @@
 # scripts/backtest_range.py
+import numpy as np
 import pandas as pd
 import argparse
 from app.analysis import dow
+from app.analysis.timeframes import read_excel_cached
 import os
 import pathlib
+import multiprocessing
+
+try:
+    from pyarrow import csv as pacsv
+except Exception:
+    pacsv = None
+
+try:
+    from numba import njit  # optional: JIT ให้ loop สรุปผลด้านล่าง
+except Exception:
+    njit = None
+
+try:
+    import python_calamine  # optional: pandas engine="calamine" (เร็วกว่า openpyxl มาก)
+except Exception:
+    python_calamine = None
+
+XLSX_ENGINE = "calamine" if python_calamine is not None else None  # None → pandas เลือกเอง (xlsx=openpyxl, xls=xlrd)
+
+KLINES_ROOT = "data/klines"  # hive dataset จาก scripts/xlsx_to_parquet.py (symbol=/tf=/year=)
 
 # ---------- Helpers ----------
 
+def _read_csv_arrow(path: str) -> pd.DataFrame:
+    """อ่าน CSV ด้วย pyarrow (C++ หลายเธรด) แปลง timestamp ในตัว parser เลย"""
+    opts = pacsv.ConvertOptions(timestamp_parsers=[pacsv.ISO8601, "%Y-%m-%d %H:%M:%S"])
+    return pacsv.read_csv(path, convert_options=opts).to_pandas()
+
+
 def _read_price_file(path: str) -> pd.DataFrame:
     """
     อ่านไฟล์ราคามาตรฐาน (timestamp, open, high, low, close, volume)
-    รองรับ .xlsx / .csv
+    รองรับ .xlsx / .csv / .parquet
     """
     if path is None:
         return None
@@ -19,45 +47,82 @@ def _read_price_file(path: str) -> pd.DataFrame:
         raise FileNotFoundError(f"ไม่พบไฟล์: {path}")
 
     if p.suffix.lower() in {".xlsx", ".xls"}:
-        df = pd.read_excel(str(p))
+        df = pd.read_excel(str(p), engine=XLSX_ENGINE)
+    elif p.suffix.lower() == ".parquet" or p.is_dir():
+        df = pd.read_parquet(str(p))
     else:
-        df = pd.read_csv(str(p))
+        df = _read_csv_arrow(str(p)) if pacsv is not None else pd.read_csv(str(p))
 
     # normalize
     if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
         df["timestamp"] = pd.to_datetime(df["timestamp"])
     df = df.sort_values("timestamp").reset_index(drop=True)
+    df.index = pd.DatetimeIndex(df["timestamp"])  # index เวลาเรียงแล้ว → ค้นช่วงด้วย binary search ได้ทันที
+    df.attrs["_sorted"] = True
     return df
 
 
-def _call_dow(df):
-    df = df.copy()
-    if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df = df.sort_values("timestamp").reset_index(drop=True)
+# ฟังก์ชัน Dow ที่มีใน dow.py (รองรับหลายชื่อ) → เลือกครั้งเดียวตอน import
+_DOW_FN = next(
+    (getattr(dow, name) for name in ("detect_swings", "detect_trend", "analyze_dow") if hasattr(dow, name)),
+    None,
+)
+
+
+def _dow_from_dict(res):
+    return {
+        "trend_primary": res.get("trend_primary") or res.get("trend") or res.get("primary"),
+        "trend_secondary": res.get("trend_secondary") or res.get("secondary"),
+        "confidence": res.get("confidence") or res.get("score") or res.get("prob"),
+    }
 
-    # รองรับหลายชื่อฟังก์ชัน
-    if hasattr(dow, "detect_swings"):
-        res = dow.detect_swings(df)
-    elif hasattr(dow, "detect_trend"):
-        res = dow.detect_trend(df)
-    elif hasattr(dow, "analyze_dow"):
-        res = dow.analyze_dow(df)
-    else:
-        raise RuntimeError("dow.py ไม่มี detect_swings / detect_trend / analyze_dow")
 
-    out = {"trend_primary": None, "trend_secondary": None, "confidence": None}
+def _dow_from_seq(res):
+    if not res:
+        return {"trend_primary": str(res), "trend_secondary": None, "confidence": None}
+    return {"trend_primary": res[0], "trend_secondary": None, "confidence": res[1] if len(res) > 1 else None}
+
+
+def _dow_from_str(res):
+    return {"trend_primary": res, "trend_secondary": None, "confidence": None}
+
+
+def _dow_from_other(res):
+    return {"trend_primary": str(res), "trend_secondary": None, "confidence": None}
+
+
+def _dow_extractor(res):
+    """เลือกตัวแปลงผลตามชนิดผลลัพธ์ (ชนิดไม่เปลี่ยนระหว่างเดือน → ตรวจแค่ผลแรก)"""
     if isinstance(res, dict):
-        out["trend_primary"]   = res.get("trend_primary") or res.get("trend") or res.get("primary")
-        out["trend_secondary"] = res.get("trend_secondary") or res.get("secondary")
-        out["confidence"]      = res.get("confidence") or res.get("score") or res.get("prob")
-    elif isinstance(res, (list, tuple)) and len(res) >= 1:
-        out["trend_primary"] = res[0]
-        if len(res) > 1: out["confidence"] = res[1]
-    elif isinstance(res, str):
-        out["trend_primary"] = res
-    else:
-        out["trend_primary"] = str(res)
+        return _dow_from_dict
+    if isinstance(res, (list, tuple)):
+        return _dow_from_seq
+    if isinstance(res, str):
+        return _dow_from_str
+    return _dow_from_other
+
+
+_DOW_EXTRACT = None
+
+
+def _call_dow(df):
+    global _DOW_EXTRACT
+    # ไม่ copy: อ่านอย่างเดียว (dow._coerce_to_df copy เองอยู่แล้ว)
+    # attrs["_sorted"] = แปลง datetime + เรียงแล้วตอนโหลด (ติดไปกับ slice/pickle) → ข้ามการตรวจทุกเดือน
+    if not df.attrs.get("_sorted"):
+        if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            df = df.assign(timestamp=pd.to_datetime(df["timestamp"]))  # frame ใหม่ ไม่แก้ของผู้เรียก
+        if not df["timestamp"].is_monotonic_increasing:
+            df = df.sort_values("timestamp")
+    df = df.reset_index(drop=True)
+
+    if _DOW_FN is None:
+        raise RuntimeError("dow.py ไม่มี detect_swings / detect_trend / analyze_dow")
+    res = _DOW_FN(df)
+
+    if _DOW_EXTRACT is None:
+        _DOW_EXTRACT = _dow_extractor(res)
+    out = _DOW_EXTRACT(res)
 
     if out["trend_primary"] is None:
         raise RuntimeError(f"อ่านผลลัพธ์ Dow ไม่ได้: {res}")
@@ -70,6 +135,13 @@ def _call_dow(df):
     return out
 
 
+def _ts_index(df: pd.DataFrame) -> pd.DatetimeIndex:
+    """DatetimeIndex ของคอลัมน์ timestamp (searchsorted รับ string วันที่ได้ตรงๆ)"""
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index  # ตั้งไว้ตอนโหลดแล้ว → ไม่สร้างใหม่ทุกเดือน
+    return pd.DatetimeIndex(df["timestamp"])
+
+
 def _last_window(df: pd.DataFrame, end_ts, max_bars: int):
     """
     ดึง 'max_bars' แท่งล่าสุดก่อนเวลา end_ts (ไม่รวม end_ts)
@@ -79,7 +151,9 @@ def _last_window(df: pd.DataFrame, end_ts, max_bars: int):
         return None
     if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
         df["timestamp"] = pd.to_datetime(df["timestamp"])
-    sub = df[df["timestamp"] < pd.to_datetime(end_ts)].tail(max_bars)
+    # df เรียงตามเวลาแล้ว (_read_price_file) → หาขอบด้วย binary search แทน boolean mask ทั้งก้อน
+    hi = int(_ts_index(df).searchsorted(end_ts, side="left"))
+    sub = df.iloc[max(0, hi - max_bars):hi]
     return sub if not sub.empty else None
 
 
@@ -155,8 +229,153 @@ def _confirm_with_intraday(
     return True, "FALLBACK", None
 
 
+def _load_klines(symbol: str, tf: str, start, end, root: str = KLINES_ROOT):
+    """
+    อ่านเฉพาะช่วง [start, end] จาก hive dataset
+    - กรอง symbol/tf/year ที่ระดับ partition (ไม่เปิดไฟล์ปีอื่นเลย)
+    - กรอง timestamp ด้วย row-group statistics + อ่านแค่คอลัมน์ OHLCV
+    ไม่มี dataset → None
+    """
+    if not os.path.isdir(root):
+        return None
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dset = ds.dataset(root, format="parquet", partitioning="hive")
+    ts_type = dset.schema.field("timestamp").type
+    # backtest_range วิเคราะห์เป็นเดือนเต็ม (วันที่ 1 ของเดือนแรก ถึงสิ้นเดือนสุดท้าย) → ขยายขอบให้ครบเดือน
+    lo = pd.Timestamp(start).normalize().replace(day=1)
+    hi = pd.Timestamp(end) + pd.offsets.MonthEnd(0)
+    if getattr(ts_type, "tz", None):
+        lo, hi = lo.tz_localize(ts_type.tz), hi.tz_localize(ts_type.tz)
+    flt = (
+        (ds.field("symbol") == symbol)
+        & (ds.field("tf") == tf)
+        & (ds.field("year") >= lo.year) & (ds.field("year") <= hi.year)
+        & (ds.field("timestamp") >= pa.scalar(lo, type=ts_type))
+        & (ds.field("timestamp") <= pa.scalar(hi, type=ts_type))
+    )
+    cols = ["timestamp", "open", "high", "low", "close", "volume"]
+    df = dset.to_table(columns=cols, filter=flt).to_pandas()
+    return df if not df.empty else None
+
+
 # ---------- Backtest Core ----------
 
+# ผลต่อเดือน (ลำดับฟิลด์ = ลำดับคอลัมน์ใน results.csv) → เก็บเป็น structured array จองไว้ครั้งเดียว
+# hit = -1 แทน "ไม่นับ" (เขียนเป็นช่องว่างตอนบันทึก CSV)
+_RECORD_DTYPE = np.dtype([
+    ("analysis_start", "U10"),
+    ("analysis_end", "U10"),
+    ("trend_daily", "U16"),
+    ("trend_pred", "U16"),
+    ("confidence", "f8"),
+    ("forward_start", "U10"),
+    ("forward_end", "U10"),
+    ("real_trend", "U4"),
+    ("actionable", "u1"),
+    ("hit", "i1"),
+    ("skip_reason", "U64"),
+])
+
+def _summary_counts(hit, actionable):
+    """เดินผ่านผลทุกเดือนรอบเดียว → (จำนวนที่ใช้งานได้, จำนวนที่ตรง)"""
+    n_used = 0
+    n_hit = 0
+    for i in range(hit.shape[0]):
+        if actionable[i]:
+            n_used += 1
+            n_hit += hit[i]
+    return n_used, n_hit
+
+
+if njit is not None:
+    _summary_counts = njit(cache=True)(_summary_counts)
+
+# context ที่ทุกเดือนใช้ร่วมกัน (intraday df + options) → ส่งให้ worker ครั้งเดียวผ่าน initializer
+_PERIOD_CTX: dict = {}
+
+
+def _init_period_ctx(ctx: dict) -> None:
+    global _PERIOD_CTX
+    _PERIOD_CTX = ctx
+
+
+def _run_one_period(analysis_df, forward_rows, real_trend, analysis_start, analysis_end, forward_start, forward_end):
+    """
+    ประเมินหนึ่งเดือน (อิสระจากเดือนอื่น → รันขนานได้)
+    real_trend ของเดือนถัดไปคำนวณมาแล้วแบบ vectorized ใน backtest_range (ส่งแค่จำนวนแถว ไม่ส่ง forward df)
+    คืน (record | None, บรรทัด log) — record เป็น tuple ตามลำดับฟิลด์ _RECORD_DTYPE
+    ให้โปรเซสหลักพิมพ์ log ตามลำดับเดือน
+    """
+    ctx = _PERIOD_CTX
+    lines = [
+        f"\nตรวจสอบช่วง {analysis_start} → {analysis_end}",
+        f"analysis rows: {len(analysis_df)}  | forward rows: {forward_rows}",
+    ]
+
+    if analysis_df.empty or not forward_rows:
+        lines.append("⚠️ ข้ามช่วงนี้เพราะไม่มีข้อมูลครบ")
+        return None, lines
+
+    # 1) Daily bias
+    res = _call_dow(analysis_df)
+    trend_daily = (res.get("trend_primary") or "N/A").upper()
+    confidence = float(res.get("confidence") or 0)
+
+    # 2) Intraday confirm (4H/1H)
+    confirmed, confirm_reason, override_trend = _confirm_with_intraday(
+        daily_trend=trend_daily,
+        forward_start=forward_start,
+        h4_df=ctx.get("h4_df"),
+        h1_df=ctx.get("h1_df"),
+        lookback_bars_4h=ctx["lookback_bars_4h"],
+        lookback_bars_1h=ctx["lookback_bars_1h"],
+        allow_side_override=ctx["allow_side_override"]
+    )
+
+    trend_for_trade = override_trend or trend_daily
+
+    # 4) Actionable rule
+    min_conf = ctx["min_conf"]
+    actionable = True
+    reason = ""
+    if ctx["skip_side"] and trend_for_trade in {"SIDE", "NEUTRAL", "FLAT"}:
+        actionable = False
+        reason = "SIDE"
+    if confidence < min_conf:
+        actionable = False
+        reason = (reason + "; " if reason else "") + f"CONF<{min_conf}"
+    if not confirmed:
+        actionable = False
+        reason = (reason + "; " if reason else "") + confirm_reason
+
+    hit = (trend_for_trade == real_trend) if actionable else None
+
+    record = (
+        analysis_start,
+        analysis_end,
+        trend_daily,
+        trend_for_trade,
+        confidence,
+        forward_start,
+        forward_end,
+        real_trend,
+        int(actionable),
+        (int(hit) if hit is not None else -1),
+        reason or confirm_reason,
+    )
+
+    if actionable:
+        lines.append(f"ทำนาย(1D bias + trigger): {trend_for_trade} ({confidence:.0f}%) | "
+                     f"ผลจริง {forward_start}→{forward_end}: {real_trend} | [{confirm_reason}]")
+        lines.append("✅ ตรง" if hit else "❌ ไม่ตรง")
+    else:
+        lines.append(f"ℹ️ ไม่คิดรอบนี้ในความแม่นยำ "
+                     f"(daily={trend_daily}, pred={trend_for_trade}, conf={confidence:.0f}%) → {reason or confirm_reason}")
+    return record, lines
+
+
 def backtest_range(
     df,
     start,
@@ -168,111 +387,98 @@ def backtest_range(
     h1_path=None,
     lookback_bars_4h=12,
     lookback_bars_1h=24,
-    allow_side_override=False
+    allow_side_override=False,
+    workers=1
 ):
     # ensure datetime + sort
     if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
         df["timestamp"] = pd.to_datetime(df["timestamp"])
     df = df.sort_values("timestamp").reset_index(drop=True)
+    df.index = pd.DatetimeIndex(df["timestamp"])
+    df.attrs["_sorted"] = True
 
     # intraday (optional)
     h4_df = _read_price_file(h4_path) if h4_path else None
     h1_df = _read_price_file(h1_path) if h1_path else None
 
-    records = []
     periods = pd.date_range(start=start, end=end, freq="ME")  # month-end
-    skipped = 0
-
-    for i in range(len(periods) - 1):
-        analysis_start = periods[i].replace(day=1).strftime("%Y-%m-%d")
-        analysis_end   = periods[i].strftime("%Y-%m-%d")
-        forward_start  = periods[i+1].replace(day=1).strftime("%Y-%m-%d")
-        forward_end    = periods[i+1].strftime("%Y-%m-%d")
-
-        analysis_df = df[(df['timestamp'] >= analysis_start) & (df['timestamp'] <= analysis_end)]
-        forward_df  = df[(df['timestamp'] >= forward_start) & (df['timestamp'] <= forward_end)]
-
-        print(f"\nตรวจสอบช่วง {analysis_start} → {analysis_end}")
-        print("analysis rows:", len(analysis_df), " | forward rows:", len(forward_df))
-
-        if analysis_df.empty or forward_df.empty:
-            print("⚠️ ข้ามช่วงนี้เพราะไม่มีข้อมูลครบ")
-            continue
 
-        # 1) Daily bias
-        res = _call_dow(analysis_df)
-        trend_daily = (res.get("trend_primary") or "N/A").upper()
-        confidence = float(res.get("confidence") or 0)
-
-        # 2) Intraday confirm (4H/1H)
-        confirmed, confirm_reason, override_trend = _confirm_with_intraday(
-            daily_trend=trend_daily,
-            forward_start=forward_start,
-            h4_df=h4_df,
-            h1_df=h1_df,
-            lookback_bars_4h=lookback_bars_4h,
-            lookback_bars_1h=lookback_bars_1h,
-            allow_side_override=allow_side_override
+    # ขอบแต่ละเดือน: [วันที่ 1, วันสิ้นเดือน] → index ใน df ด้วย searchsorted ครั้งเดียว
+    ts = _ts_index(df)
+    # คำนวณวันที่ 1/วันสิ้นเดือนด้วย datetime64 ทั้ง array (ไม่ replace/strftime ทีละเดือน)
+    ends_d = periods.values.astype("datetime64[D]")
+    starts_d = periods.values.astype("datetime64[M]").astype("datetime64[D]")
+    month_starts = np.datetime_as_string(starts_d, unit="D").tolist()
+    month_ends = np.datetime_as_string(ends_d, unit="D").tolist()
+    starts_ix, ends_ix = pd.DatetimeIndex(starts_d), pd.DatetimeIndex(ends_d)
+    if ts.tz is not None:
+        starts_ix, ends_ix = starts_ix.tz_localize(ts.tz), ends_ix.tz_localize(ts.tz)
+    lo_idx = ts.searchsorted(starts_ix, side="left") if len(periods) else []
+    hi_idx = ts.searchsorted(ends_ix, side="right") if len(periods) else []
+
+    # 3) Ground truth ทุกเดือนในครั้งเดียว: open แรก vs close สุดท้ายของแต่ละเดือน
+    lo_arr = np.asarray(lo_idx, dtype=np.int64)
+    hi_arr = np.asarray(hi_idx, dtype=np.int64)
+    rows = hi_arr - lo_arr
+    if len(df):
+        first_open = df["open"].to_numpy(dtype=float)[np.minimum(lo_arr, len(df) - 1)]
+        last_close = df["close"].to_numpy(dtype=float)[np.maximum(hi_arr - 1, 0)]
+        real_trend = np.where(last_close > first_open, "UP", "DOWN")
+    else:
+        real_trend = np.full(len(rows), "DOWN")
+
+    tasks = [
+        (
+            df.iloc[lo_idx[i]:hi_idx[i]],
+            int(rows[i+1]),
+            str(real_trend[i+1]),
+            month_starts[i], month_ends[i], month_starts[i+1], month_ends[i+1],
         )
-
-        trend_for_trade = override_trend or trend_daily
-
-        # 3) Ground truth (เดือนถัดไป)
-        start_price = float(forward_df.iloc[0]["open"])
-        end_price   = float(forward_df.iloc[-1]["close"])
-        real_trend = "UP" if end_price > start_price else "DOWN"
-
-        # 4) Actionable rule
-        actionable = True
-        reason = ""
-        if skip_side and trend_for_trade in {"SIDE", "NEUTRAL", "FLAT"}:
-            actionable = False
-            reason = "SIDE"
-        if confidence < min_conf:
-            actionable = False
-            reason = (reason + "; " if reason else "") + f"CONF<{min_conf}"
-        if not confirmed:
-            actionable = False
-            reason = (reason + "; " if reason else "") + confirm_reason
-
-        hit = (trend_for_trade == real_trend) if actionable else None
-
-        records.append({
-            "analysis_start": analysis_start,
-            "analysis_end": analysis_end,
-            "trend_daily": trend_daily,
-            "trend_pred": trend_for_trade,
-            "confidence": confidence,
-            "forward_start": forward_start,
-            "forward_end": forward_end,
-            "real_trend": real_trend,
-            "actionable": int(actionable),
-            "hit": (int(hit) if hit is not None else ""),
-            "skip_reason": reason or confirm_reason
-        })
-
-        if actionable:
-            print(f"ทำนาย(1D bias + trigger): {trend_for_trade} ({confidence:.0f}%) | "
-                  f"ผลจริง {forward_start}→{forward_end}: {real_trend} | [{confirm_reason}]")
-            print("✅ ตรง" if hit else "❌ ไม่ตรง")
-        else:
-            skipped += 1
-            print(f"ℹ️ ไม่คิดรอบนี้ในความแม่นยำ "
-                  f"(daily={trend_daily}, pred={trend_for_trade}, conf={confidence:.0f}%) → {reason or confirm_reason}")
+        for i in range(len(periods) - 1)
+    ]
+    ctx = {
+        "h4_df": h4_df,
+        "h1_df": h1_df,
+        "lookback_bars_4h": lookback_bars_4h,
+        "lookback_bars_1h": lookback_bars_1h,
+        "allow_side_override": allow_side_override,
+        "min_conf": min_conf,
+        "skip_side": skip_side,
+    }
+
+    # แต่ละเดือนอิสระต่อกัน → workers>1 กระจายไปหลายโปรเซส (ผลเรียงตามลำดับเดือนเหมือนเดิม)
+    if workers and workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(workers, initializer=_init_period_ctx, initargs=(ctx,)) as pool:
+            results = pool.starmap(_run_one_period, tasks)
+    else:
+        _init_period_ctx(ctx)
+        results = [_run_one_period(*t) for t in tasks]
+
+    records = np.empty(len(results), dtype=_RECORD_DTYPE)
+    n = 0
+    for record, lines in results:
+        print("\n".join(lines))
+        if record is None:
+            continue
+        records[n] = record
+        n += 1
+    records = records[:n]
 
     # 5) Summary
-    result_df = pd.DataFrame(records)
-    if not result_df.empty:
+    if n:
+        result_df = pd.DataFrame(records)
+        result_df["hit"] = result_df["hit"].astype(object).where(records["hit"] >= 0, "")
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
         result_df.to_csv(save_path, index=False)
         print(f"\n✅ บันทึกผลลัพธ์ที่ {save_path}")
 
-        used = result_df[result_df["actionable"] == 1]
-        if not used.empty:
-            acc = (used["hit"].astype(int).mean()) * 100
+        n_used, hits = (int(x) for x in _summary_counts(records["hit"], records["actionable"]))
+        skipped = n - n_used
+        if n_used:
+            acc = hits / n_used * 100
             print("\n=== สรุป Backtest (เฉพาะสัญญาณที่ใช้เทรดได้) ===")
-            print(f"จำนวนรอบทั้งหมด: {len(result_df)} | ใช้งานได้: {len(used)} | ถูกข้าม: {skipped}")
-            print(f"ตรง: {used['hit'].sum()} | ไม่ตรง: {len(used) - used['hit'].sum()}")
+            print(f"จำนวนรอบทั้งหมด: {n} | ใช้งานได้: {n_used} | ถูกข้าม: {skipped}")
+            print(f"ตรง: {hits} | ไม่ตรง: {n_used - hits}")
             print(f"ความแม่นยำ: {acc:.2f}%")
         else:
             print("\n⚠️ ไม่มีสัญญาณที่เข้าเงื่อนไขนำมาคิดความแม่นยำ")
@@ -291,16 +497,24 @@ if __name__ == "__main__":
     parser.add_argument("--no-skip-side", action="store_true", help="ถ้าใส่ flag นี้ จะนับ SIDE เป็นสัญญาณด้วย")
 
     # NEW: Intraday confirm options
-    parser.add_argument("--h4", type=str, default=None, help="ไฟล์ราคา 4H (.xlsx หรือ .csv) มีคอลัมน์ timestamp,open,high,low,close,volume")
-    parser.add_argument("--h1", type=str, default=None, help="ไฟล์ราคา 1H (.xlsx หรือ .csv) มีคอลัมน์ timestamp,open,high,low,close,volume")
+    parser.add_argument("--h4", type=str, default=None, help="ไฟล์ราคา 4H (.xlsx / .csv / .parquet) มีคอลัมน์ timestamp,open,high,low,close,volume")
+    parser.add_argument("--h1", type=str, default=None, help="ไฟล์ราคา 1H (.xlsx / .csv / .parquet) มีคอลัมน์ timestamp,open,high,low,close,volume")
     parser.add_argument("--lb4h", type=int, default=12, help="จำนวนแท่ง 4H ล่าสุดก่อนช่วง forward_start ที่ใช้สรุปเทรนด์")
     parser.add_argument("--lb1h", type=int, default=24, help="จำนวนแท่ง 1H ล่าสุดก่อนช่วง forward_start ที่ใช้สรุปเทรนด์")
     parser.add_argument("--allow-side-override", action="store_true",
                         help="อนุญาตให้ 4H และ 1H เห็นตรงกัน (UP/DOWN) แล้ว override สถานะ SIDE รายวันให้เป็นทิศนั้น")
 
+    parser.add_argument("--workers", type=int, default=1, help="จำนวนโปรเซสที่ใช้ประเมินแต่ละเดือนขนานกัน (1 = ทำทีละเดือน)")
+
     args = parser.parse_args()
 
-    df = pd.read_excel("app/data/historical.xlsx")
+    # ลำดับแหล่งข้อมูล 1D: hive dataset (อ่านเฉพาะช่วง) → Parquet partition ของชีท → xlsx เดิม
+    df = _load_klines("BTCUSDT", "1D", args.start, args.end)
+    daily_parquet = "app/data/historical.parquet/sheet=BTCUSDT_1D"
+    if df is None and os.path.isdir(daily_parquet):
+        df = pd.read_parquet(daily_parquet)
+    elif df is None:
+        df = read_excel_cached("app/data/historical.xlsx")
     backtest_range(
         df,
         start=args.start,
@@ -312,5 +526,6 @@ if __name__ == "__main__":
         h1_path=args.h1,
         lookback_bars_4h=args.lb4h,
         lookback_bars_1h=args.lb1h,
-        allow_side_override=args.allow_side_override
+        allow_side_override=args.allow_side_override,
+        workers=args.workers
     )
@@ -11,13 +11,16 @@ from app.analysis.indicators import apply_indicators
 # IO: โหลด CSV ราคา
 # -----------------------------
 def load_price(symbol: str, tf: str) -> pd.DataFrame:
+    # .parquet (ไฟล์หลักจาก scripts/fetch_ohlcv.py) ก่อน แล้วค่อย CSV เดิม
     candidates = [
+        f"data/{symbol}_{tf}.parquet",
         f"data/{symbol}_{tf}.csv",
+        f"app/data/{symbol}_{tf}.parquet",
         f"app/data/{symbol}_{tf}.csv",
     ]
     for p in candidates:
         if os.path.exists(p):
-            df = pd.read_csv(p)
+            df = pd.read_parquet(p) if p.endswith(".parquet") else pd.read_csv(p)
             lower2orig = {c.lower(): c for c in df.columns}
 
             def pick(*names):
@@ -41,8 +44,12 @@ def load_price(symbol: str, tf: str) -> pd.DataFrame:
                 raise KeyError(f"Missing columns {sorted(miss)} in {p}")
 
             if pd.api.types.is_numeric_dtype(df["time"]):
+                # epoch = UTC → เวลากรุงเทพแบบ naive ให้ตรงกับ CSV (กติกาเดียวกับ _parse_and_clean_strict)
                 unit = "ms" if df["time"].max() > 10**12 else "s"
-                df["time"] = pd.to_datetime(df["time"], unit=unit)
+                df["time"] = (
+                    pd.to_datetime(df["time"], unit=unit, utc=True)
+                    .dt.tz_convert("Asia/Bangkok").dt.tz_localize(None)
+                )
             else:
                 df["time"] = pd.to_datetime(df["time"], errors="coerce")
 
@@ -50,7 +57,7 @@ def load_price(symbol: str, tf: str) -> pd.DataFrame:
                 raise ValueError(f"Failed to parse time in {p}")
 
             return df.sort_values("time").reset_index(drop=True)
-    raise FileNotFoundError(f"CSV for {symbol}_{tf} not found in {candidates}")
+    raise FileNotFoundError(f"Price file for {symbol}_{tf} not found in {candidates}")
 
 # -----------------------------
 # คำนวณอินดิเคเตอร์ (เรียก RULES)
@@ -249,7 +256,7 @@ def forward_test(df: pd.DataFrame,
 # -----------------------------
 # CLI
 # -----------------------------
-def main():
+def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description="Forward Test (ADX/EMA/RSI + ATR TP/SL)")
     ap.add_argument("--symbol", default="BTCUSDT")
     ap.add_argument("--tf", default="1H", choices=["1D","4H","1H"])
@@ -266,8 +273,10 @@ def main():
     ap.add_argument("--leverage", type=float, default=1.0, help="คูณผลลัพธ์กำไร/ขาดทุนเป็น %")
     ap.add_argument("--out", default="output/forward_atr_results.csv")
     ap.add_argument("--no-plots", action="store_true", help="ข้ามการวาดกราฟ")
-    args = ap.parse_args()
+    return ap
 
+def run(args: argparse.Namespace) -> int:
+    """รัน forward test ใน process เดียวกับผู้เรียก (คืน 0 เมื่อสำเร็จ)"""
     df_all = load_price(args.symbol, args.tf)
     if args.start: df_all = df_all[df_all["time"] >= pd.to_datetime(args.start)]
     if args.end:   df_all = df_all[df_all["time"] <= pd.to_datetime(args.end)]
@@ -276,7 +285,7 @@ def main():
 
     if len(df_all) == 0:
         os.makedirs(os.path.dirname(args.out), exist_ok=True)
-        pd.DataFrame().to_csv(args.out, index=False); print(f"[WARN] Empty window -> {args.out}"); return
+        pd.DataFrame().to_csv(args.out, index=False); print(f"[WARN] Empty window -> {args.out}"); return 0
 
     df = add_indicators(df_all)
     need = max(args.min_bars, 200) + args.horizon + 1
@@ -358,6 +367,8 @@ def main():
 
     # Plots
     if not args.no_plots:
+        import matplotlib
+        matplotlib.use("Agg")  # savefig อย่างเดียว → renderer ไม่ต้องเริ่ม GUI toolkit
         import matplotlib.pyplot as plt
         # Equity curve (by trade)
         eq_png = "output/equity_curve.png"
@@ -390,6 +401,10 @@ def main():
         plt.xticks(rotation=60); plt.tight_layout()
         plt.savefig(meq_png, dpi=150); plt.close()
         print(f"[SAVED] {meq_png}")
+    return 0
+
+def main(argv=None) -> int:
+    return run(build_parser().parse_args(argv))
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
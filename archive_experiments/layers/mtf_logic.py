@@ -1,35 +1,74 @@
 from __future__ import annotations
 
 from typing import Dict, Tuple, Callable, Iterable
+import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit  # optional: JIT ให้ loop อินดิเคเตอร์
+except Exception:
+    njit = None
+
 from .mtf_config import (
     TFS_DEFAULT, WEIGHTS, VOL_MIN, NEAR_EPS, MIN_BARS, TAIL
 )
 
 DataGetter = Callable[[str, str], pd.DataFrame]  # (symbol, tf) -> DataFrame
 
+def _indicators_loop(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    EMA50/EMA200 + RSI14 (EMA-style, alpha=1/14) + ATR14 (ewm span=14) ในลูปเดียว
+    ให้ผลเท่ากับสูตร pandas เดิม (ewm adjust=False, แท่งแรก RSI=0, TR แท่งแรก=high-low)
+    คืน array (5, n): ema50, ema200, rsi14, atr14, atr_pct
+    """
+    n = close.shape[0]
+    out = np.empty((5, n))
+    if n == 0:
+        return out
+    a50, a200 = 2.0 / 51.0, 2.0 / 201.0
+    a_rsi, a_atr = 1.0 / 14.0, 2.0 / 15.0
+    e50 = e200 = close[0]
+    ag = al = 0.0
+    atr = abs(high[0] - low[0])
+    for i in range(n):
+        c = close[i]
+        if i > 0:
+            e50 = a50 * c + (1.0 - a50) * e50
+            e200 = a200 * c + (1.0 - a200) * e200
+            pc = close[i - 1]
+            d = c - pc
+            g = d if d > 0 else 0.0
+            l = -d if d < 0 else 0.0
+            if i == 1:
+                ag, al = g, l
+            else:
+                ag = a_rsi * g + (1.0 - a_rsi) * ag
+                al = a_rsi * l + (1.0 - a_rsi) * al
+            tr = max(abs(high[i] - low[i]), abs(high[i] - pc), abs(low[i] - pc))
+            atr = a_atr * tr + (1.0 - a_atr) * atr
+            rs = ag / (al if al != 0.0 else 1e-12)
+            out[2, i] = 100.0 - 100.0 / (1.0 + rs)
+        else:
+            out[2, i] = 0.0
+        out[0, i] = e50
+        out[1, i] = e200
+        out[3, i] = atr
+        out[4, i] = atr / c
+    return out
+
+if njit is not None:
+    _indicators_loop = njit(cache=True)(_indicators_loop)
+
 def _prep_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
-    # EMA
-    df["ema50"]  = df["close"].ewm(span=50,  adjust=False).mean()
-    df["ema200"] = df["close"].ewm(span=200, adjust=False).mean()
-    # RSI14 (EMA-style)
-    delta = df["close"].diff()
-    gain  = delta.clip(lower=0)
-    loss  = (-delta).clip(lower=0)
-    avg_gain = gain.ewm(alpha=1/14, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1/14, adjust=False).mean()
-    rs = (avg_gain / (avg_loss.replace(0, 1e-12))).fillna(0)
-    df["rsi14"] = 100 - (100 / (1 + rs))
-    # ATR14 (% of close)
-    prev_close = df["close"].shift(1)
-    tr1 = (df["high"] - df["low"]).abs()
-    tr2 = (df["high"] - prev_close).abs()
-    tr3 = (df["low"]  - prev_close).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    df["atr14"] = tr.ewm(span=14, adjust=False).mean()
-    df["atr_pct"] = (df["atr14"] / df["close"]).fillna(0)
+    out = _indicators_loop(
+        df["high"].to_numpy(dtype=np.float64),
+        df["low"].to_numpy(dtype=np.float64),
+        df["close"].to_numpy(dtype=np.float64),
+    )
+    for k, name in enumerate(("ema50", "ema200", "rsi14", "atr14", "atr_pct")):
+        df[name] = out[k]
+    df["atr_pct"] = df["atr_pct"].fillna(0)
     return df
 
 def _classify_row(row: pd.Series, tf: str) -> str:
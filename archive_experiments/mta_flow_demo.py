@@ -1,6 +1,8 @@
 # scripts/mta_flow_demo.py
 # MTA: 1D→4H→1H พร้อมพิมพ์ PLAN & ALERT สั้นๆ
 
+import numpy as np
+
 from app.analysis.timeframes import get_data
 from app.logic.scenarios import analyze_scenarios   # ✅ เปลี่ยน import มาที่ logic
 from app.analysis.indicators import apply_indicators
@@ -65,8 +67,9 @@ def main():
     df_1h = get_data(SYMBOL, "1H")
     df_1h_ind = apply_indicators(df_1h)
     last = df_1h_ind.iloc[-1]
-    recent_high_1h = float(df_1h["high"].tail(20).max())
-    recent_low_1h  = float(df_1h["low"].tail(20).min())
+    # swing 20 แท่งล่าสุดจาก numpy view ตรงๆ (ไม่ copy Series ผ่าน tail); nan* = ข้าม NaN แบบ pandas
+    recent_high_1h = float(np.nanmax(df_1h["high"].to_numpy()[-20:]))
+    recent_low_1h  = float(np.nanmin(df_1h["low"].to_numpy()[-20:]))
 
     print("\n=== 3) FRAME: 1H (Trigger/Execution) ===")
     spot = {"close": float(last["close"]), "rsi14": float(last["rsi14"]), "macd_hist": float(last["macd_hist"])}
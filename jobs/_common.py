@@ -0,0 +1,151 @@
+# jobs/_common.py
+# =============================================================================
+# Shared helpers สำหรับ jobs/* (ใช้ร่วมกันใน process เดียว)
+# =============================================================================
+from __future__ import annotations
+
+import gzip
+import os
+import pickle
+import time
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from app.analysis.timeframes import get_data
+
+_EX = None
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+_TF_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400, "1w": 604800}
+
+
+@lru_cache(maxsize=None)
+def _env(name: str, default: str | None = None) -> str | None:
+    """อ่าน ENV (ค่าคงที่ตลอด process → cache ได้)"""
+    v = os.getenv(name, default)
+    return v if v not in (None, "") else default
+
+
+def _get_bool_env(name: str, default: bool = False) -> bool:
+    v = (_env(name, None) or "").strip().lower()
+    if v in ("1", "true", "yes", "y", "on"): return True
+    if v in ("0", "false", "no", "n", "off"): return False
+    return default
+
+
+@cache
+def _get_ccxt():
+    """import ccxt แบบ lazy ครั้งเดียว (โมดูลใหญ่ → ไม่จ่ายตอน import job ถ้าไม่ได้ใช้); ไม่มี → None"""
+    try:
+        import ccxt
+    except Exception:
+        return None
+    return ccxt
+
+
+def _ex():
+    """คืน ccxt.binance ตัวเดียวต่อ process (load_markets ครั้งเดียว)"""
+    global _EX
+    ccxt = _get_ccxt()
+    if ccxt is None:
+        raise RuntimeError("ccxt not available")
+    if _EX is None:
+        ex = ccxt.binance({"enableRateLimit": True})
+        ex.load_markets()
+        _EX = ex
+    return _EX
+
+
+@lru_cache(maxsize=32)
+def _cached_get(symbol: str, tf: str, bucket: int, xlsx_path: Optional[str], parquet_path: Optional[str]) -> pd.DataFrame:
+    return get_data(symbol, tf, xlsx_path=xlsx_path, parquet_path=parquet_path)
+
+
+def cached_get_data(
+    symbol: str,
+    tf: str,
+    *,
+    xlsx_path: Optional[str] = None,
+    parquet_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    get_data ที่ memoize ภายในนาทีเดียวกัน (key = symbol, tf, นาที, path)
+    ผู้เรียกซ้อนกันใน process เดียวได้ DataFrame ตัวเดียวกัน → ห้ามแก้ไข in-place
+    ถ้าไฟล์ต้นทางถูกเขียนใหม่ระหว่างรัน ให้เรียก clear_data_cache()
+    """
+    return _cached_get(symbol, tf, int(time.time() // 60), xlsx_path, parquet_path)
+
+
+def clear_data_cache() -> None:
+    _cached_get.cache_clear()
+
+
+def _bar_cached(cache_dir: Path, bar: int, suffix: str, loader):
+    """
+    cache บนดิสก์ (pickle+gzip) ต่อแท่ง: {cache_dir}/{bar}{suffix}
+    - มีไฟล์ของแท่งนี้แล้ว → คืนจากไฟล์ ไม่เรียก loader
+    - loader ล้ม → คืนไฟล์ล่าสุดที่มี (stale) แทน ถ้าไม่มีเลยค่อย raise
+    - เก็บไว้แค่ไฟล์ของแท่งล่าสุด
+    """
+    hit = cache_dir / f"{bar}{suffix}"
+
+    if hit.exists():
+        try:
+            with gzip.open(hit, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            pass
+
+    try:
+        value = loader()
+    except Exception:
+        stale = sorted(cache_dir.glob(f"*{suffix}")) if cache_dir.exists() else []
+        if not stale:
+            raise
+        with gzip.open(stale[-1], "rb") as f:
+            return pickle.load(f)
+
+    if value is not None and len(value):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = hit.with_suffix(".tmp")
+        with gzip.open(tmp, "wb", compresslevel=1) as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, hit)
+        for old in cache_dir.glob(f"*{suffix}"):
+            if old != hit:
+                old.unlink(missing_ok=True)
+    return value
+
+
+def _bar_open(timeframe: str) -> int:
+    step = _TF_SECONDS.get(timeframe.lower(), 3600)
+    return int(time.time()) // step * step
+
+
+def cached_fetch_ohlcv(ex, symbol: str, timeframe: str, limit: int) -> list:
+    """
+    ex.fetch_ohlcv แบบมี cache บนดิสก์ (pickle+gzip) ต่อแท่ง:
+      {CACHE_DIR}/ohlcv/{symbol}/{timeframe}/{bar_open_sec}_{limit}.pkl.gz
+    - ภายในแท่งเดียวกัน (TTL = ความยาว TF) ไม่ยิง API ซ้ำ
+    - ถ้า fetch ล้ม → คืนผลจาก cache ล่าสุดที่มี (stale) แทน
+    """
+    cache_dir = Path(CACHE_DIR) / "ohlcv" / symbol.replace("/", "") / timeframe
+    return _bar_cached(
+        cache_dir,
+        _bar_open(timeframe),
+        f"_{limit}.pkl.gz",
+        lambda: ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit),
+    )
+
+
+def cached_bar_get_data(symbol: str, tf: str) -> pd.DataFrame:
+    """
+    get_data ที่ cache บนดิสก์ต่อแท่งของ TF นั้น:
+      {CACHE_DIR}/data/{symbol}/{tf}/{bar_open_sec}.pkl.gz
+    สำหรับ job ที่ cron รันถี่กว่า TF (เช่นทุกนาทีกับแท่ง 30M) → โหลดใหม่เมื่อขึ้นแท่งใหม่เท่านั้น
+    """
+    cache_dir = Path(CACHE_DIR) / "data" / symbol.replace("/", "") / tf.upper()
+    return _bar_cached(cache_dir, _bar_open(tf), ".pkl.gz", lambda: get_data(symbol, tf))
@@ -1,8 +1,9 @@
 # jobs/daily_btc_analysis.py
 """
 Daily BTC Analysis Job
-ดึง BTCUSDT 1D → อัปเดต app/data/historical.xlsx → ส่งเข้า engine วิเคราะห์
+ดึง BTCUSDT 1D → อัปเดต app/data/historical.parquet → ส่งเข้า engine วิเคราะห์
 ถ้ามีสัญญาณเข้า/ออก → ส่ง LINE แจ้งเตือน
+(historical.xlsx เขียนเพิ่มเฉพาะเมื่อตั้ง EMIT_XLSX=1)
 
 วิธีรัน:
     python -m jobs.daily_btc_analysis
@@ -12,30 +13,50 @@ Daily BTC Analysis Job
 
 from __future__ import annotations
 
+import json
 import os
 import sys
+import time
 import traceback
-from datetime import datetime, timezone
+import zipfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from xml.sax.saxutils import escape as _xml_escape
 
+import numpy as np
 import pandas as pd
-from pandas.api.types import is_datetime64tz_dtype
+from openpyxl import Workbook, load_workbook
+
+try:
+    import xlsxwriter  # writer เร็วกว่าสำหรับการเขียนไฟล์ใหม่ทั้งไฟล์
+except Exception:
+    xlsxwriter = None
 
 # === โปรเจกต์โมดูล ===
-from app.analysis.timeframes import get_data
 from app.services.wave_service import analyze_wave, build_brief_message
 from app.analysis.entry_exit import suggest_trade, format_trade_text
 from app.adapters import delivery_line as line
+from jobs._common import _ex, cached_get_data
 
 # ---------------- Config ----------------
 HIST_PATH = "app/data/historical.xlsx"
+HIST_PARQUET = "app/data/historical.parquet"  # store หลัก (partition ตามชื่อชีท)
+HIST_TIP_PATH = "app/data/.hist_tip"           # {sheet: ts ของแท่งล่าสุดที่เขียนไปแล้ว (ns)}
+EMIT_XLSX = os.getenv("EMIT_XLSX", "").strip().lower() in ("1", "true", "yes", "on")
+MAX_LOOKBACK = int(os.getenv("HIST_MAX_LOOKBACK", "750"))  # จำนวนแท่งท้ายสุดที่เขียนลง XLSX
 SYMBOL = "BTCUSDT"
 TF = "1D"
 PROFILE = os.getenv("STRATEGY_PROFILE", "baseline")  # baseline | chinchot | cholak
 LINE_TO = os.getenv("LINE_DEFAULT_TO", "").strip()   # ถ้าเว้นว่างจะ broadcast
 
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+CCXT_PAGE_LIMIT = 1000  # Binance ตัดที่ 1000 แท่งต่อ request
+_TF_MS = {"1H": 3_600_000, "4H": 14_400_000, "1D": 86_400_000, "1W": 604_800_000}
+_TZ_BKK = ZoneInfo("Asia/Bangkok")
+
 # -------------- Helpers -----------------
 def _now_utc_str() -> str:
-    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    return time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
 
 def _excel_sanitize_datetimes(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -43,15 +64,124 @@ def _excel_sanitize_datetimes(df: pd.DataFrame) -> pd.DataFrame:
     - แปลง index ถ้าเป็น DatetimeIndex ที่มี tz → แปลงเป็น UTC แล้วตัด tz ออก
     - แปลงคอลัมน์ที่เป็น datetime64[ns, tz] → UTC → tz-naive
     """
-    out = df.copy()
-    if isinstance(out.index, pd.DatetimeIndex) and out.index.tz is not None:
+    tz_cols = df.select_dtypes(include=["datetimetz"]).columns
+    tz_index = isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None
+    if not len(tz_cols) and not tz_index:
+        return df
+
+    # assign คืน frame ใหม่ที่แชร์ block ของคอลัมน์ที่ไม่ถูกแตะ (ไม่ต้อง copy ทั้งก้อน)
+    out = df.assign(**{c: df[c].dt.tz_convert("UTC").dt.tz_localize(None) for c in tz_cols})
+    if tz_index:
         out.index = out.index.tz_convert("UTC").tz_localize(None)
-    for col in out.columns:
-        s = out[col]
-        if is_datetime64tz_dtype(s):
-            out[col] = s.dt.tz_convert("UTC").dt.tz_localize(None)
     return out
 
+# ---- Minimal XLSX (เขียน XML ตรงลง zip สำหรับชีท OHLCV ล้วน ไม่มี styling) ----
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+    '</Relationships>'
+)
+# style 1 = วันที่เวลา (numFmt 164) สำหรับคอลัมน์ A
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_XLSX_COLS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+def write_ohlcv_xlsx(df: pd.DataFrame, path: str, sheet: str) -> None:
+    """
+    เขียน OHLCV (timestamp + ตัวเลขล้วน) เป็น .xlsx ชีทเดียว โดยประกอบ XML เองลง zip
+    - header อยู่ใน sharedStrings, ตัวเลขเขียนเป็น <c><v>repr(float)</v></c>
+    - timestamp → Excel serial (epoch 1899-12-30) + style วันที่ (s="1")
+    - ค่า NaN จะไม่เขียน cell (เว้นว่าง)
+    """
+    cols = [str(c) for c in df.columns]
+    if len(cols) > len(_XLSX_COLS):
+        raise ValueError(f"write_ohlcv_xlsx รองรับไม่เกิน {len(_XLSX_COLS)} คอลัมน์")
+
+    columns = []
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            if s.dt.tz is not None:
+                s = s.dt.tz_convert("UTC").dt.tz_localize(None)
+            columns.append(((s - _EXCEL_EPOCH) / pd.Timedelta(days=1)).tolist())
+        else:
+            columns.append(pd.to_numeric(s, errors="coerce").astype("float64").tolist())
+    styles = [' s="1"' if pd.api.types.is_datetime64_any_dtype(df[c]) else "" for c in df.columns]
+
+    header = "".join(f'<c r="{_XLSX_COLS[j]}1" t="s"><v>{j}</v></c>' for j in range(len(cols)))
+    shared = "".join(f"<si><t>{_xml_escape(c)}</t></si>" for c in cols)
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{_xml_escape(sheet, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        zf.writestr("xl/workbook.xml", workbook)
+        zf.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        zf.writestr("xl/styles.xml", _XLSX_STYLES)
+        zf.writestr(
+            "xl/sharedStrings.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{len(cols)}" '
+            f'uniqueCount="{len(cols)}">{shared}</sst>',
+        )
+        with zf.open("xl/worksheets/sheet1.xml", "w") as fh:
+            fh.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            fh.write(f'<row r="1">{header}</row>'.encode())
+            buf: list[str] = []
+            for i, values in enumerate(zip(*columns), start=2):
+                cells = "".join(
+                    f'<c r="{_XLSX_COLS[j]}{i}"{styles[j]}><v>{v!r}</v></c>'
+                    for j, v in enumerate(values)
+                    if v == v  # ข้าม NaN
+                )
+                buf.append(f'<row r="{i}">{cells}</row>')
+                if len(buf) >= 1000:
+                    fh.write("".join(buf).encode())
+                    buf.clear()
+            fh.write("".join(buf).encode())
+            fh.write(b"</sheetData></worksheet>")
+
 def save_df_to_excel(df: pd.DataFrame, path: str, sheet: str) -> None:
     """
     เขียนทั้งชีท (replace) เพื่อกัน schema เพี้ยน + ทำ tz‑naive เสมอ
@@ -60,7 +190,7 @@ def save_df_to_excel(df: pd.DataFrame, path: str, sheet: str) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
     # บังคับให้ timestamp เป็นคอลัมน์ (กรณีเป็น index อยู่ก่อน)
-    df_to_write = df.copy()
+    df_to_write = df
     if "timestamp" not in df_to_write.columns:
         # ถ้า index เป็นเวลาจะย้ายมาไว้ในคอลัมน์ timestamp
         if isinstance(df_to_write.index, pd.DatetimeIndex):
@@ -69,13 +199,149 @@ def save_df_to_excel(df: pd.DataFrame, path: str, sheet: str) -> None:
     # ล้าง tz ในทุก datetime
     df_to_write = _excel_sanitize_datetimes(df_to_write)
 
-    mode = "a" if os.path.exists(path) else "w"
-    if mode == "a":
-        with pd.ExcelWriter(path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-            df_to_write.to_excel(writer, sheet_name=sheet, index=False)
+    # ไฟล์ใหม่ หรือมีแค่ชีทนี้ชีทเดียว → เขียนทับทั้งไฟล์ด้วย xlsxwriter
+    others: list[str] = []
+    if os.path.exists(path):
+        # read_only ถือ zip handle ไว้จนกว่าจะ close → ปิดก่อนเขียนทับ path
+        wb_ro = load_workbook(path, read_only=True)
+        try:
+            others = [s for s in wb_ro.sheetnames if s != sheet]
+        finally:
+            wb_ro.close()
+    if not others and list(df_to_write.columns) == OHLCV_COLUMNS:
+        # ชีท OHLCV ล้วน → ประกอบ XML เองลง zip (ไม่ผ่าน object model ของ openpyxl/xlsxwriter)
+        write_ohlcv_xlsx(df_to_write, path, sheet)
+        return
+    if xlsxwriter is not None and not others:
+        # เขียนทีละคอลัมน์ (write_column) แทนทีละ cell ผ่าน to_excel; NaN/NaT → None = cell ว่าง
+        wb = xlsxwriter.Workbook(path)
+        try:
+            ws = wb.add_worksheet(sheet)
+            dt_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+            ws.write_row(0, 0, [str(c) for c in df_to_write.columns])
+            for j, c in enumerate(df_to_write.columns):
+                col = df_to_write[c]
+                values = col.astype(object).where(col.notna(), None).tolist()
+                fmt = dt_fmt if pd.api.types.is_datetime64_any_dtype(col) else None
+                ws.write_column(1, j, values, fmt)
+        finally:
+            wb.close()
+        return
+
+    # มีชีทอื่นด้วย → แทนที่เฉพาะชีทนี้แบบ stream (ไม่ผ่าน ExcelWriter mode="a" ที่ต้อง parse/serialize ทุกชีท)
+    if os.path.exists(path):
+        wb = load_workbook(path)
+        pos = None
+        if sheet in wb.sheetnames:
+            pos = wb.sheetnames.index(sheet)
+            del wb[sheet]
+        ws = wb.create_sheet(sheet, pos)
     else:
-        with pd.ExcelWriter(path, engine="openpyxl", mode="w") as writer:
-            df_to_write.to_excel(writer, sheet_name=sheet, index=False)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet)
+
+    ws.append([str(c) for c in df_to_write.columns])
+    for row in df_to_write.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(path)
+
+def save_df_to_parquet(df: pd.DataFrame, path: str, sheet: str) -> None:
+    """
+    เขียน OHLCV ลง Parquet dataset (zstd) โดยใช้ชื่อชีทเป็น partition column
+    แทนที่เฉพาะ partition ของชีทนี้ ชีทอื่นไม่ถูกแตะ
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    df_to_write = df
+    if "timestamp" not in df_to_write.columns and isinstance(df_to_write.index, pd.DatetimeIndex):
+        df_to_write = df_to_write.reset_index().rename(columns={"index": "timestamp"})
+
+    df_to_write.assign(sheet=sheet).to_parquet(
+        path,
+        engine="pyarrow",
+        compression="zstd",
+        index=False,
+        partition_cols=["sheet"],
+        existing_data_behavior="delete_matching",
+    )
+
+def fetch_ohlcv_ccxt_binance(symbol: str, tf: str, since_ms: int | None = None) -> list[list]:
+    """
+    ดึง OHLCV จาก Binance ผ่าน ccxt แบบแบ่งหน้าด้วย since cursor
+    - since_ms=None → หน้าล่าสุดหน้าเดียว (cold start)
+    - มี since_ms → ไล่ดึงต่อจนถึงแท่งปัจจุบัน
+    """
+    ex = _ex()
+    sym = symbol if "/" in symbol else symbol.replace("USDT", "/USDT")
+    tf_ms = _TF_MS[tf.upper()]
+
+    rows: list[list] = []
+    while True:
+        chunk = ex.fetch_ohlcv(sym, tf.lower(), since=since_ms, limit=CCXT_PAGE_LIMIT)
+        if not chunk:
+            break
+        rows.extend(chunk)
+        if since_ms is None or len(chunk) < CCXT_PAGE_LIMIT:
+            break
+        since_ms = chunk[-1][0] + tf_ms
+    return rows
+
+def _ohlcv_soa(raw: list[list]) -> tuple[np.ndarray, np.ndarray]:
+    """list-of-lists จาก ccxt → (ts int64[n], ohlcv float64[n, 5]) แบบ contiguous"""
+    if not raw:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+    arr = np.asarray(raw, dtype=np.float64)
+    return arr[:, 0].astype(np.int64), np.ascontiguousarray(arr[:, 1:6])
+
+def _frame_from_soa(ts: np.ndarray, ohlcv: np.ndarray) -> pd.DataFrame:
+    data = {"timestamp": pd.to_datetime(ts, unit="ms", utc=True)}
+    data.update({c: ohlcv[:, k] for k, c in enumerate(OHLCV_COLUMNS[1:])})
+    return pd.DataFrame(data)
+
+def load_ohlcv_incremental(symbol: str, tf: str, path: str = HIST_PARQUET) -> pd.DataFrame:
+    """
+    อ่าน partition เดิมจาก Parquet แล้วดึงเฉพาะแท่งใหม่ตั้งแต่แท่งล่าสุดที่เก็บไว้
+    (ดึงแท่งล่าสุดซ้ำด้วย เพราะอาจเป็นแท่งที่ยังไม่ปิดตอนเขียนครั้งก่อน)
+    """
+    sheet = f"{symbol}_{tf}"
+    old = None
+    since_ms = None
+    if os.path.exists(path):
+        try:
+            old = pd.read_parquet(path, columns=OHLCV_COLUMNS, filters=[("sheet", "==", sheet)])
+        except Exception:
+            old = None
+    if old is not None and not old.empty:
+        since_ms = int(old["timestamp"].max().timestamp() * 1000)
+
+    new = _frame_from_soa(*_ohlcv_soa(fetch_ohlcv_ccxt_binance(symbol, tf, since_ms=since_ms)))
+    if old is None or old.empty:
+        return new
+
+    return (
+        pd.concat([old, new], ignore_index=True)
+        .drop_duplicates(subset="timestamp", keep="last")
+        .sort_values("timestamp")
+        .reset_index(drop=True)
+    )
+
+def _read_hist_tips(path: str = HIST_TIP_PATH) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def _write_hist_tip(sheet: str, tip: int, path: str = HIST_TIP_PATH) -> None:
+    """อัปเดต sidecar แบบ atomic (เขียนไฟล์ชั่วคราวแล้ว os.replace)"""
+    tips = _read_hist_tips(path)
+    tips[sheet] = tip
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(tips, f)
+    os.replace(tmp, path)
 
 def send_line(text: str) -> None:
     """
@@ -99,9 +365,15 @@ def send_line(text: str) -> None:
 def main() -> None:
     print(f"[{_now_utc_str()}] Start daily BTC analysis job")
 
-    # 1) โหลดราคาสด (ไม่ส่ง xlsx_path) → 1D ล่าสุดเต็มช่วง
+    # 1) โหลดราคาสด: Parquet เดิม + แท่งใหม่จาก ccxt (fallback → get_data)
     print("• Fetching fresh OHLCV from provider (1D)…")
-    df_1d = get_data(SYMBOL, TF)  # ตอนนี้ get_data รองรับ fallback ccxt อยู่ในตัวแล้ว
+    try:
+        df_1d = load_ohlcv_incremental(SYMBOL, TF)
+    except Exception as e:
+        print(f"• Incremental ccxt fetch failed ({e}) → fallback get_data")
+        df_1d = None
+    if df_1d is None or df_1d.empty:
+        df_1d = cached_get_data(SYMBOL, TF)
 
     # แสดงผลลัพธ์สั้น ๆ
     n = len(df_1d) if df_1d is not None else 0
@@ -111,14 +383,24 @@ def main() -> None:
     if n == 0:
         raise RuntimeError("get_data() returned empty df")
 
-    # 2) อัปเดต historical.xlsx (ชีท: BTCUSDT_1D) ให้เป็นข้อมูลล่าสุดเสมอ
+    # 2) อัปเดต historical.parquet (partition: BTCUSDT_1D) ให้เป็นข้อมูลล่าสุดเสมอ
+    #    ถ้าแท่งล่าสุดยังเป็นแท่งเดิม (1D ยังไม่ปิด) → ข้ามการเขียนทั้งหมด
     sheet_name = f"{SYMBOL}_{TF}"
-    print(f"• Writing latest data to {HIST_PATH} (sheet: {sheet_name}) … rows={n}")
-    save_df_to_excel(df_1d, HIST_PATH, sheet_name)
+    tip = int(pd.Timestamp(df_1d["timestamp"].iloc[-1]).value)
+    if _read_hist_tips().get(sheet_name) == tip and os.path.exists(HIST_PARQUET):
+        print("• No new bar, skip historical write")
+    else:
+        print(f"• Writing latest data to {HIST_PARQUET} (sheet: {sheet_name}) … rows={n}")
+        save_df_to_parquet(df_1d, HIST_PARQUET, sheet_name)
+        if EMIT_XLSX:
+            df_write = df_1d.tail(MAX_LOOKBACK) if MAX_LOOKBACK > 0 else df_1d
+            print(f"• EMIT_XLSX → writing {HIST_PATH} (sheet: {sheet_name}) … rows={len(df_write)}")
+            save_df_to_excel(df_write, HIST_PATH, sheet_name)
+        _write_hist_tip(sheet_name, tip)
 
-    # 3) วิเคราะห์จากไฟล์เดียวกัน (ให้ pipeline อื่นอ้างอิงสอดคล้อง)
-    print("• Analyzing wave/summary from historical.xlsx …")
-    payload = analyze_wave(SYMBOL, TF, xlsx_path=HIST_PATH)
+    # 3) วิเคราะห์จาก df ในหน่วยความจำ (ไฟล์ข้างบนเป็นแค่ archive ให้ pipeline อื่น)
+    print("• Analyzing wave/summary from in-memory OHLCV …")
+    payload = analyze_wave(SYMBOL, TF, xlsx_path=HIST_PATH, parquet_path=HIST_PARQUET, df=df_1d)
     brief = build_brief_message(payload)
 
     # 4) สร้างสัญญาณเข้า/ออกตามโปรไฟล์ (ใช้ df จาก payload ถ้ามี)
@@ -132,7 +414,7 @@ def main() -> None:
         df_for_trade,
         symbol=SYMBOL,
         tf=TF,
-        cfg={"profile": PROFILE, "xlsx_path": HIST_PATH},
+        cfg={"profile": PROFILE, "xlsx_path": HIST_PATH, "parquet_path": HIST_PARQUET},
     )
     trade_text = format_trade_text(suggestion)
 
@@ -144,9 +426,9 @@ def main() -> None:
     except Exception:
         has_entry = False
 
-    header = f"🗓 {datetime.now().strftime('%Y-%m-%d %H:%M')} (Asia/Bangkok)\n"
+    header = f"🗓 {datetime.now(_TZ_BKK).strftime('%Y-%m-%d %H:%M')} (Asia/Bangkok)\n"
     body = (
-        f"📈 Daily BTC Analysis (from provider → saved to Excel)\n"
+        f"📈 Daily BTC Analysis (from provider → saved to Parquet)\n"
         f"{brief}\n\n"
         f"{trade_text}"
     )
@@ -165,10 +447,15 @@ if __name__ == "__main__":
     try:
         main()
     except Exception as e:
-        err = f"❌ Daily BTC job failed: {e}\n{traceback.format_exc()}"
+        # จำกัด stack 10 frame (ไม่ตาม __cause__) ให้พอดีเพดาน 1800 ตัวอักษรของข้อความ LINE
+        tb = "".join(traceback.format_exception(type(e), e, e.__traceback__, limit=10, chain=False))
+        err = f"❌ Daily BTC job failed: {e}\n{tb}"
         print(err, file=sys.stderr)
+        if len(err) > 1800:
+            # ตัดช่วงกลางออก คงหัวข้อความ + frame ท้ายสุด (จุดที่ error เกิดจริง)
+            err = f"{err[:600]}\n…\n{err[-1190:]}"
         try:
-            send_line(err[:1800])
+            send_line(err)
         except Exception:
             pass
         sys.exit(1)
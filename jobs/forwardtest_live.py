@@ -1,33 +1,68 @@
 # jobs/forwardtest_live.py
 import argparse
 import os
-import subprocess
+import re
 import pandas as pd
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from archive_experiments.forward_test import build_parser as ft_parser, run as run_ft
 
 def find_csv(symbol: str, tf: str) -> str:
-    cands = [f"data/{symbol}_{tf}.csv", f"app/data/{symbol}_{tf}.csv"]
+    # ลำดับเดียวกับ forward_test.load_price (.parquet ก่อน CSV)
+    cands = [
+        f"data/{symbol}_{tf}.parquet", f"data/{symbol}_{tf}.csv",
+        f"app/data/{symbol}_{tf}.parquet", f"app/data/{symbol}_{tf}.csv",
+    ]
     for p in cands:
         if os.path.exists(p):
             return p
     raise SystemExit(f"❌ ไม่พบไฟล์ราคา: {cands}")
 
+_ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+def _parse_time_strings(col: pd.Series) -> pd.Series:
+    """แปลงสตริงเวลาด้วย format ที่รู้ก่อน (vectorized) แล้วค่อย coerce เป็นทางสุดท้าย"""
+    first = col.dropna()
+    first = str(first.iloc[0]) if len(first) else ""
+    if _ISO_DATE_RE.match(first):
+        for fmt in ("%Y-%m-%d %H:%M:%S", "ISO8601"):
+            try:
+                return pd.to_datetime(col, format=fmt)
+            except (ValueError, TypeError):
+                continue
+    return pd.to_datetime(col, errors="coerce")
+
 def read_last_date(csv_path: str):
-    # หา column เวลาแบบยืดหยุ่น
-    df_head = pd.read_csv(csv_path, nrows=5)
-    lower2orig = {c.lower(): c for c in df_head.columns}
+    # หา column เวลาแบบยืดหยุ่น (ดูจาก schema ของ batch แรก / metadata ของ Parquet ไม่ต้อง parse ทั้งไฟล์)
+    is_parquet = csv_path.endswith(".parquet")
+    if is_parquet:
+        names = pq.read_schema(csv_path).names
+    else:
+        with pacsv.open_csv(csv_path) as reader:
+            names = reader.schema.names
+    lower2orig = {c.lower(): c for c in names}
     for k in ["time", "timestamp", "open_time", "date", "datetime"]:
         if k in lower2orig:
             time_col = lower2orig[k]
             break
     else:
-        raise SystemExit(f"❌ ไม่พบคอลัมน์เวลาใน {csv_path}: {list(df_head.columns)}")
+        raise SystemExit(f"❌ ไม่พบคอลัมน์เวลาใน {csv_path}: {list(names)}")
 
-    col = pd.read_csv(csv_path, usecols=[time_col])[time_col]
-    if pd.api.types.is_numeric_dtype(col):
+    # อ่านเฉพาะคอลัมน์เวลา (Parquet: อ่านคอลัมน์เดียว / CSV: parser ของ pyarrow แบบ multi-threaded)
+    if is_parquet:
+        table = pq.read_table(csv_path, columns=[time_col])
+    else:
+        table = pacsv.read_csv(csv_path, convert_options=pacsv.ConvertOptions(include_columns=[time_col]))
+    col = table.column(0).to_pandas()
+    if pd.api.types.is_datetime64_any_dtype(col):
+        t = col
+    elif pd.api.types.is_numeric_dtype(col):
+        # epoch = UTC → เวลากรุงเทพแบบ naive (แบบเดียวกับ forward_test.load_price / CSV)
         unit = "ms" if col.max() > 10**12 else "s"
-        t = pd.to_datetime(col, unit=unit, errors="coerce")
+        t = pd.to_datetime(col, unit=unit, utc=True, errors="coerce").dt.tz_convert("Asia/Bangkok").dt.tz_localize(None)
     else:
-        t = pd.to_datetime(col, errors="coerce")
+        t = _parse_time_strings(col)
     if t.isna().all():
         raise SystemExit("❌ เวลาเป็น NaT ทั้งหมด")
     return t.max().date()
@@ -38,13 +73,18 @@ def main():
     ap.add_argument("--tf", default="1H", choices=["1H","4H","1D"])
     ap.add_argument("--start", default="2025-09-01")       # จุดเริ่ม forward จริง
     ap.add_argument("--target-end", default="2025-11-01")  # สิ้นสุดเป้า
-    ap.add_argument("--tp", type=float, default=0.008)
-    ap.add_argument("--sl", type=float, default=0.008)
+    # forward_test ใช้ TP/SL เป็นพหุคูณ ATR (ไม่มี TP/SL แบบ % คงที่) → --tp/--sl เดิมใช้ไม่ได้แล้ว
+    ap.add_argument("--tp", type=float, default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--sl", type=float, default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--atr-tp-k", type=float, default=None, help="TP = k*ATR (default ตาม forward_test)")
+    ap.add_argument("--atr-sl-k", type=float, default=None, help="SL = k*ATR (default ตาม forward_test)")
     ap.add_argument("--horizon", type=int, default=24)
     ap.add_argument("--min-bars", type=int, default=20)
     ap.add_argument("--adx-min", type=float, default=0.0)
     ap.add_argument("--out", default="output/forwardtest_live_window.csv")
     args = ap.parse_args()
+    if args.tp is not None or args.sl is not None:
+        ap.error("--tp/--sl ไม่รองรับแล้ว: forward_test ใช้ TP/SL แบบ ATR → ใช้ --atr-tp-k / --atr-sl-k แทน")
 
     csv_path = find_csv(args.symbol, args.tf)
     data_last = read_last_date(csv_path)
@@ -60,26 +100,27 @@ def main():
         return
 
     os.makedirs("output", exist_ok=True)
-    cmd = [
-        "python", "scripts/forward_test.py",
-        "--symbol", args.symbol,
-        "--tf", args.tf,
-        "--start", args.start,
-        "--end", str(dyn_end),
-        "--tp", str(args.tp),
-        "--sl", str(args.sl),
-        "--horizon", str(args.horizon),
-        "--min-bars", str(args.min_bars),
-        "--out", args.out
-    ]
+    # รัน forward test ใน process เดียวกัน (ไม่ต้อง spawn interpreter ใหม่ / import pandas ซ้ำ)
+    ft_args = ft_parser().parse_args([])
+    ft_args.symbol = args.symbol
+    ft_args.tf = args.tf
+    ft_args.start = args.start
+    ft_args.end = str(dyn_end)
+    ft_args.horizon = args.horizon
+    ft_args.min_bars = args.min_bars
+    ft_args.out = args.out
     if args.adx_min and float(args.adx_min) > 0:
-        cmd += ["--adx-min", str(args.adx_min)]
+        ft_args.adx_min = float(args.adx_min)
+    if args.atr_tp_k is not None:
+        ft_args.atr_tp_k = args.atr_tp_k
+    if args.atr_sl_k is not None:
+        ft_args.atr_sl_k = args.atr_sl_k
 
     print(f"📅 Data last = {data_last} | target_end = {target_end} | use END = {dyn_end}")
-    print("▶️", " ".join(cmd))
-    rc = subprocess.call(cmd)
+    print("▶️ forward_test.run", vars(ft_args))
+    rc = run_ft(ft_args)
     if rc != 0:
-        raise SystemExit(f"❌ forward_test.py exit code {rc}")
+        raise SystemExit(f"❌ forward_test exit code {rc}")
     print(f"✅ saved -> {args.out}")
 
 if __name__ == "__main__":
@@ -23,21 +23,25 @@
 
 from __future__ import annotations
 import os
+import hashlib
+import json
 import logging
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from app.services.signal_service import analyze_and_get_text
 from app.adapters.delivery_line import LineDelivery
-from app.analysis.timeframes import get_data
 from app.analysis import timeframes as tf_mod
-
-try:
-    import ccxt
-except Exception:
-    ccxt = None
+from jobs._common import (
+    CACHE_DIR, _env, _ex, _get_bool_env, _get_ccxt, cached_fetch_ohlcv, cached_get_data, clear_data_cache,
+)
 
 log = logging.getLogger("jobs.push_btc_hourly")
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
@@ -46,40 +50,215 @@ logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 # =============================================================================
 # Helpers
 # =============================================================================
-def _env(name: str, default: str | None = None) -> str | None:
-    v = os.getenv(name, default)
-    return v if v not in (None, "") else default
+_TF_MAP = {"1H": "1h", "4H": "4h", "1D": "1d"}
+
+@lru_cache(maxsize=64)
+def _to_ccxt_symbol(symbol: str) -> str:
+    """BTCUSDT → BTC/USDT (ถ้ามี / อยู่แล้วคืนเดิม)"""
+    return symbol if "/" in symbol else symbol.replace("USDT", "/USDT")
+
+@lru_cache(maxsize=None)
+def _line_client(access: str, secret: str) -> LineDelivery:
+    """สร้าง LineDelivery ครั้งเดียวต่อ process ต่อ credential (session/TLS ใช้ซ้ำทุกการส่ง)"""
+    return LineDelivery(access, secret)
+
+_OHLCV_COLS = ["timestamp","open","high","low","close","volume"]
+_OHLCV_SCHEMA = pa.schema(
+    [("timestamp", pa.int64())] + [(c, pa.float64()) for c in _OHLCV_COLS[1:]]
+)
+_DELTA_LIMIT = 200  # จำนวนแท่งต่อหน้าเมื่อดึงเฉพาะส่วนต่าง
+
+# โฟลเดอร์ app/data (ที่ get_data มองหาไฟล์ก่อน) — สร้างครั้งเดียวตอน import
+_DATA_DIR = Path(tf_mod._csv_candidates("BTCUSDT", "1H")[0]).parent
+_DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+def _ohlcv_cache_path(symbol: str, tf_name: str) -> Path:
+    return Path(tf_mod._csv_candidates(symbol, tf_name)[0]).with_suffix(".parquet")
 
-def _get_bool_env(name: str, default: bool = False) -> bool:
-    v = (_env(name, None) or "").strip().lower()
-    if v in ("1", "true", "yes", "y", "on"): return True
-    if v in ("0", "false", "no", "n", "off"): return False
-    return default
+def _write_ohlcv_cache(symbol: str, tf_name: str, ohlcv: list | pd.DataFrame) -> None:
+    """
+    เขียน OHLCV (list-of-lists จาก ccxt หรือ DataFrame) เป็น Parquet (snappy) ข้างไฟล์ CSV ที่ get_data มองหา
+    get_data จะใช้ .parquet นี้ก่อน CSV (ถ้าไม่เก่ากว่า CSV)
+    """
+    # สร้าง Arrow table ตาม schema ตรง ๆ (ไม่ผ่าน DataFrame/การเดา dtype)
+    if isinstance(ohlcv, pd.DataFrame):
+        table = pa.Table.from_pandas(ohlcv[_OHLCV_COLS], schema=_OHLCV_SCHEMA, preserve_index=False)
+    else:
+        cols = list(zip(*ohlcv))  # transpose ครั้งเดียว: แถว → คอลัมน์
+        table = pa.Table.from_arrays(
+            [pa.array(cols[i], type=f.type) for i, f in enumerate(_OHLCV_SCHEMA)],
+            schema=_OHLCV_SCHEMA,
+        )
+    out = _ohlcv_cache_path(symbol, tf_name)
+    pq.write_table(table, out, compression="snappy")
+    log.info("Quick-filled Parquet: %s (%s rows)", out, table.num_rows)
+
+def _fetch_delta(ex, symbol_ccxt: str, tf_name: str, since_ms: int) -> list:
+    """ดึงเฉพาะแท่งตั้งแต่ since_ms (รวมแท่งล่าสุดเดิมที่อาจยังไม่ปิด) แบ่งหน้าจนถึงปัจจุบัน"""
+    rows: list = []
+    while True:
+        chunk = ex.fetch_ohlcv(symbol_ccxt, timeframe=_TF_MAP[tf_name], since=since_ms, limit=_DELTA_LIMIT)
+        if not chunk:
+            break
+        rows.extend(chunk)
+        if len(chunk) < _DELTA_LIMIT or chunk[-1][0] <= since_ms:
+            break
+        since_ms = chunk[-1][0] + 1
+    return rows
 
 def _quick_fill_csv(symbol: str, tf_name: str, limit: int = 1200) -> bool:
-    """ดึง OHLCV ผ่าน ccxt แล้วเขียน CSV ไปที่ app/data เพื่อให้ get_data ใช้ต่อ (รองรับ 1H/4H/1D)"""
+    """
+    ดึง OHLCV ผ่าน ccxt แล้วเขียน cache (Parquet) ไปที่ app/data เพื่อให้ get_data ใช้ต่อ (รองรับ 1H/4H/1D)
+    - มี cache เดิม → ดึงเฉพาะแท่งตั้งแต่ timestamp ล่าสุดแล้วต่อท้าย
+    - ยังไม่มี → ดึงเต็ม limit แท่ง
+    """
+    ccxt = _get_ccxt()
     if ccxt is None:
         log.warning("ccxt not available; skip quick fill.")
         return False
-    tf_map = {"1H": "1h", "4H": "4h", "1D": "1d"}
-    if tf_name not in tf_map:
+    if tf_name not in _TF_MAP:
         return False
     try:
-        ex = ccxt.binance()
-        symbol_ccxt = symbol.replace("USDT", "/USDT")
-        ohlcv = ex.fetch_ohlcv(symbol_ccxt, timeframe=tf_map[tf_name], limit=limit)
+        ex = _ex()
+        symbol_ccxt = _to_ccxt_symbol(symbol)
+
+        old = None
+        path = _ohlcv_cache_path(symbol, tf_name)
+        if path.exists():
+            try:
+                old = pd.read_parquet(path, engine="pyarrow", columns=_OHLCV_COLS)
+            except Exception:
+                old = None
+
+        if old is not None and not old.empty:
+            new = _fetch_delta(ex, symbol_ccxt, tf_name, int(old["timestamp"].max()))
+            if not new:
+                return True
+            merged = (
+                pd.concat([old, pd.DataFrame(new, columns=_OHLCV_COLS)], ignore_index=True)
+                .drop_duplicates(subset="timestamp", keep="last")
+                .sort_values("timestamp")
+                .tail(limit)
+            )
+            _write_ohlcv_cache(symbol, tf_name, merged)
+            return True
+
+        ohlcv = cached_fetch_ohlcv(ex, symbol_ccxt, _TF_MAP[tf_name], limit)
         if not ohlcv:
             return False
-        df = pd.DataFrame(ohlcv, columns=["timestamp","open","high","low","close","volume"])
-        out = tf_mod._csv_path(symbol, tf_name)
-        Path(out).parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(out, index=False)
-        log.info("Quick-filled CSV: %s (%s rows)", out, len(df))
+        _write_ohlcv_cache(symbol, tf_name, ohlcv)
         return True
-    except Exception as e:
+    # จับเฉพาะความล้มเหลวของ exchange/IO/ข้อมูล; bug ในโค้ด (NameError/TypeError ฯลฯ) ต้องเด้งออกมาให้เห็น
+    except (ccxt.BaseError, OSError, ValueError, pa.ArrowException) as e:
         log.warning("quick_fill failed for %s %s: %s", symbol, tf_name, e)
         return False
 
+def _load_tf(symbol: str, tf: str, xlsx: str | None, when: str = "") -> pd.DataFrame | None:
+    try:
+        df = cached_get_data(symbol, tf, xlsx_path=xlsx)
+        log.info("DEBUG%s: %s get_data returned %s rows", when, tf, 0 if df is None else len(df))
+        return df
+    except Exception as e:
+        log.error("[%s] Data fetch error%s: %s", tf, when, e)
+        log.debug("Traceback:\n%s", traceback.format_exc())
+        return None
+
+def _last_push_path(symbol: str, tf: str) -> Path:
+    return Path(CACHE_DIR) / "last_push" / f"{symbol}_{tf}.json"
+
+def _read_last_push(symbol: str, tf: str) -> dict:
+    try:
+        with open(_last_push_path(symbol, tf), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def _write_last_push(symbol: str, tf: str, last_ts: int, text: str) -> None:
+    """บันทึกแท่งล่าสุด + ข้อความที่ส่งไปแล้ว (atomic ผ่าน os.replace)"""
+    path = _last_push_path(symbol, tf)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "last_ts": last_ts,
+            "last_text_hash": hashlib.md5(text.encode("utf-8")).hexdigest(),
+            "text": text,
+        }, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+@lru_cache(maxsize=32)
+def _analyze(symbol: str, tf: str, profile: str, xlsx: str | None, last_ts: int) -> str:
+    """
+    memo ของ analyze_and_get_text ภายใน process: key มี timestamp แท่งล่าสุด
+    → แท่งใหม่มาเมื่อไหร่ key เปลี่ยน คำนวณใหม่เอง
+    """
+    return analyze_and_get_text(symbol, tf, profile=profile, cfg={"profile": profile}, xlsx_path=xlsx)
+
+_PUSHED_TTL_SEC = 2 * 86400
+
+def _claim_push(idem: str) -> bool:
+    """
+    SETNX แบบไฟล์: สร้าง {CACHE_DIR}/pushed/{idem} ด้วย O_EXCL
+    คืน False ถ้ามีคน (cron รอบซ้อน/redeploy) ส่งข้อความชุดนี้ไปแล้ว
+    """
+    d = Path(CACHE_DIR) / "pushed"
+    d.mkdir(parents=True, exist_ok=True)
+    cutoff = time.time() - _PUSHED_TTL_SEC
+    for old in d.iterdir():  # marker เก่าเกินอายุ → ลบทิ้ง (ไม่ให้โฟลเดอร์โตไม่หยุด)
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
+    try:
+        os.close(os.open(d / idem, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+def _release_push(idem: str) -> None:
+    (Path(CACHE_DIR) / "pushed" / idem).unlink(missing_ok=True)
+
+def _process_tf(symbol: str, tf: str, profile: str, xlsx: str | None) -> tuple[str, str | None, int, int | None, bool]:
+    """
+    งานของ TF เดียว: โหลดข้อมูล → (ถ้าน้อย) quick-fill ผ่าน ccxt แล้วโหลดใหม่ → วิเคราะห์
+    ถ้าแท่งล่าสุดยังเป็นแท่งเดียวกับที่ส่งไปแล้ว → ใช้ข้อความเดิม ไม่วิเคราะห์ซ้ำ
+    คืน (tf, text หรือ None, จำนวนแถว, timestamp แท่งล่าสุด (ns), unchanged)
+    """
+    df = _load_tf(symbol, tf, xlsx)
+    n = 0 if df is None else len(df)
+
+    # ถ้าข้อมูลน้อย → quick-fill ผ่าน ccxt แล้วโหลดใหม่
+    if n < 5:
+        log.warning("[%s] No/low data (len=%s). Try quick fill via ccxt…", tf, n)
+        if _quick_fill_csv(symbol, tf, limit=1200):
+            clear_data_cache()  # cache ไฟล์เพิ่งถูกเขียนใหม่
+            df = _load_tf(symbol, tf, xlsx, "(after quick fill)")
+            n = 0 if df is None else len(df)
+
+    # ข้าม TF ที่ยังไม่มีข้อมูล
+    if n < 5 or df is None or getattr(df, "empty", False):
+        log.warning("[%s] still no data; skip.", tf)
+        return tf, None, n, None, False
+
+    last_ts = int(pd.Timestamp(df["timestamp"].iloc[-1]).value)
+    prev = _read_last_push(symbol, tf)
+    if prev.get("last_ts") == last_ts and prev.get("text"):
+        log.info("[%s] bar unchanged since last push; reuse text", tf)
+        return tf, prev["text"], n, last_ts, True
+
+    # วิเคราะห์ข้อความสรุปสำหรับ TF นั้น ๆ
+    try:
+        txt = _analyze(symbol, tf, profile, xlsx, last_ts)
+        if txt and str(txt).strip():
+            return tf, str(txt).strip(), n, last_ts, False
+        log.warning("[%s] Empty analysis text", tf)
+    except Exception as e:
+        log.error("[%s] Analyze failed: %s", tf, e)
+        log.debug("Traceback:\n%s", traceback.format_exc())
+    return tf, None, n, last_ts, False
+
 
 # =============================================================================
 # Main
@@ -95,47 +274,22 @@ def main() -> int:
 
     texts: dict[str, str] = {}
     rows_count: dict[str, int] = {}
+    last_ts: dict[str, int] = {}
+    unchanged: list[bool] = []
 
-    # --- วนดึง/วิเคราะห์ทีละ TF ---
-    for tf in tfs:
-        try:
-            df = get_data(symbol, tf, xlsx_path=xlsx)
-            n = 0 if df is None else len(df)
+    # --- โหลด + วิเคราะห์ทุก TF พร้อมกัน (ccxt/ไฟล์/pandas ปล่อย GIL → ใช้เวลา ~TF ที่ช้าที่สุด) ---
+    with ThreadPoolExecutor(max_workers=len(tfs)) as ex:
+        for tf, txt, n, ts, same in ex.map(lambda t: _process_tf(symbol, t, profile, xlsx), tfs):
             rows_count[tf] = n
-            log.info("DEBUG: %s get_data returned %s rows", tf, n)
-        except Exception as e:
-            log.error("[%s] Data fetch error: %s", tf, e)
-            log.debug("Traceback:\n%s", traceback.format_exc())
-            continue
-
-        # ถ้าข้อมูลน้อย ลอง quick-fill แล้วโหลดใหม่
-        if n < 5 or df is None or getattr(df, "empty", False):
-            log.warning("[%s] No/low data (len=%s). Try quick fill via ccxt…", tf, n)
-            if _quick_fill_csv(symbol, tf, limit=1200):
-                try:
-                    df = get_data(symbol, tf, xlsx_path=xlsx)
-                    n = 0 if df is None else len(df)
-                    rows_count[tf] = n
-                    log.info("DEBUG(after quick fill): %s get_data returned %s rows", tf, n)
-                except Exception as e:
-                    log.error("[%s] Data fetch error after quick fill: %s", tf, e)
-                    continue
-
-        # ข้าม TF ที่ยังไม่มีข้อมูล
-        if n < 5 or df is None or getattr(df, "empty", False):
-            log.warning("[%s] still no data; skip.", tf)
-            continue
-
-        # วิเคราะห์ข้อความสรุปสำหรับ TF นั้น ๆ
-        try:
-            txt = analyze_and_get_text(symbol, tf, profile=profile, cfg={"profile": profile}, xlsx_path=xlsx)
-            if txt and str(txt).strip():
-                texts[tf] = str(txt).strip()
-            else:
-                log.warning("[%s] Empty analysis text", tf)
-        except Exception as e:
-            log.error("[%s] Analyze failed: %s", tf, e)
-            log.debug("Traceback:\n%s", traceback.format_exc())
+            if txt:
+                texts[tf] = txt
+                last_ts[tf] = ts
+                unchanged.append(same)
+
+    # ทุก TF ยังเป็นแท่งเดิมกับที่ส่งไปแล้ว → ข้อความเหมือนเดิมทุกตัวอักษร ไม่ต้องส่งซ้ำ
+    if unchanged and all(unchanged):
+        log.info("No new bar on any TF since last push; skip.")
+        return 0
 
     # --- รวมผล: ยึด 1D เป็นสรุปหลัก + แนบบริบท 4H/1H ---
     if "1D" not in texts and not texts:
@@ -177,7 +331,15 @@ def main() -> int:
         print(final_text)
         return 0
 
-    client = LineDelivery(access, secret)
+    # idempotency: symbol + แท่งล่าสุดของทุก TF ที่อยู่ในข้อความ → ส่งชุดเดียวกันได้ครั้งเดียว
+    idem = hashlib.sha1(
+        "|".join([symbol] + [f"{tf}:{last_ts[tf]}" for tf in tfs if tf in last_ts]).encode("utf-8")
+    ).hexdigest()
+    if not _claim_push(idem):
+        log.info("Same bars already pushed (idem=%s); skip.", idem[:12])
+        return 0
+
+    client = _line_client(access, secret)
 
     # ไม่มี LINE_DEFAULT_TO → บังคับ broadcast ป้องกันตกหล่น
     if not do_broadcast and not _env("LINE_DEFAULT_TO"):
@@ -190,14 +352,22 @@ def main() -> int:
         to_id = _env("LINE_DEFAULT_TO")
         if not to_id:
             log.error("Missing LINE_DEFAULT_TO for push")
+            _release_push(idem)
             return 3
         log.info("Pushing multi-TF signal to %s …", to_id)
         resp = client.push_text(to_id, final_text)
 
     if not resp.get("ok"):
         log.error("LINE send failed: %s", resp)
+        _release_push(idem)  # ให้รอบถัดไปลองส่งใหม่ได้
         return 1
 
+    for tf, txt in texts.items():
+        try:
+            _write_last_push(symbol, tf, last_ts[tf], txt)
+        except Exception as e:
+            log.warning("[%s] cannot record last push: %s", tf, e)
+
     log.info("Job done.")
     return 0
 
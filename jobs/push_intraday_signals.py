@@ -1,13 +1,19 @@
 from __future__ import annotations
-import os, time
+import os, asyncio, json
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 from typing import List, Dict, Any
 from pathlib import Path
 
-import schedule
 import pandas as pd
 import requests
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except Exception:
+    orjson = None
+
 # โหลด .env จากรากโปรเจกต์
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
@@ -16,17 +22,42 @@ from app.engine.signal_engine import SignalEngine
 
 TF_LIST = ["5M", "15M", "30M"]
 
+LINE_PUSH_URL = "https://api.line.me/v2/bot/message/push"
+LINE_MAX_MESSAGES = 5      # LINE push รับได้สูงสุด 5 ข้อความต่อ request
+PUSH_CONCURRENCY = 8
+PUSH_RETRIES = 3
+
+# session เดียวต่อ process สำหรับ push แบบ sync (ใช้ TCP/TLS ซ้ำข้ามรอบ schedule)
+_SESSION = requests.Session()
+
 # ---------- LINE push ----------
+_JSON_HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+
+def _dumps(body: Dict[str, Any]) -> bytes:
+    """serialize body เป็น bytes (orjson ถ้ามี; ไม่มีก็ json มาตรฐาน)"""
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+@cache
+def _get_httpx():
+    """import httpx แบบ lazy (ใช้เฉพาะรอบที่มีสัญญาณต้องส่ง); ไม่มี → None"""
+    try:
+        import httpx
+    except Exception:
+        return None
+    return httpx
+
 def _push_via_line_messaging(text: str) -> bool:
     token = os.getenv("LINE_CHANNEL_ACCESS_TOKEN")
     to = os.getenv("LINE_USER_ID")
     if not token or not to:
         return False
     try:
-        r = requests.post(
-            "https://api.line.me/v2/bot/message/push",
-            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-            json={"to": to, "messages": [{"type": "text", "text": text[:4999]}]},
+        r = _SESSION.post(
+            LINE_PUSH_URL,
+            headers={"Authorization": f"Bearer {token}", **_JSON_HEADERS},
+            data=_dumps({"to": to, "messages": [{"type": "text", "text": text[:4999]}]}),
             timeout=8,
         )
         return r.status_code == 200
@@ -51,7 +82,7 @@ def _push_via_line_notify(text: str) -> bool:
     if not token:
         return False
     try:
-        r = requests.post(
+        r = _SESSION.post(
             "https://notify-api.line.me/api/notify",
             headers={"Authorization": f"Bearer {token}"},
             data={"message": text[:999]},
@@ -67,6 +98,45 @@ def push_line(text: str) -> None:
     if _push_via_line_notify(text): return
     print("[LINE:FALLBACK]", text)
 
+async def _push_batch_async(client, sem: asyncio.Semaphore, to: str, texts: List[str]) -> bool:
+    """ส่ง 1 request (≤5 ข้อความ) พร้อม retry/backoff สำหรับ 429/5xx/เครือข่ายล่ม"""
+    payload = _dumps({"to": to, "messages": [{"type": "text", "text": t[:4999]} for t in texts]})
+    async with sem:
+        for attempt in range(PUSH_RETRIES):
+            try:
+                r = await client.post(LINE_PUSH_URL, content=payload, headers=_JSON_HEADERS)
+                if r.status_code == 200:
+                    return True
+                if r.status_code != 429 and r.status_code < 500:
+                    return False
+            except Exception:
+                pass
+            await asyncio.sleep(0.3 * (2 ** attempt))
+    return False
+
+async def _push_many_async(texts: List[str]) -> List[bool]:
+    """
+    ส่งหลายข้อความผ่าน LINE Messaging API: รวมทีละ 5 ข้อความต่อ request
+    แล้วยิงพร้อมกัน (จำกัด PUSH_CONCURRENCY) บน AsyncClient ตัวเดียว (keep-alive)
+    คืนผลต่อข้อความ (True = ส่งสำเร็จ)
+    """
+    token = os.getenv("LINE_CHANNEL_ACCESS_TOKEN")
+    to = os.getenv("LINE_USER_ID")
+    if not texts or not token or not to:
+        return [False] * len(texts)
+    httpx = _get_httpx()
+    if httpx is None:
+        return [False] * len(texts)
+
+    batches = [texts[i:i + LINE_MAX_MESSAGES] for i in range(0, len(texts), LINE_MAX_MESSAGES)]
+    sem = asyncio.Semaphore(PUSH_CONCURRENCY)
+    async with httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=8,
+    ) as client:
+        ok = await asyncio.gather(*[_push_batch_async(client, sem, to, b) for b in batches])
+    return [flag for b, flag in zip(batches, ok) for _ in b]
+
 # ---------- Scan logic ----------
 def scan_symbol(symbol: str, *, limit: int = 500, confidence_gate: int = 60) -> List[str]:
     msgs: List[str] = []
@@ -80,8 +150,12 @@ def scan_symbol(symbol: str, *, limit: int = 500, confidence_gate: int = 60) ->
         "move_alerts": [],
     })
 
+    # ดึงทุก TF พร้อมกัน (network-bound) แล้วค่อยประมวลผลทีละ TF (CPU-bound, engine มี state)
+    with ThreadPoolExecutor(max_workers=len(TF_LIST)) as ex:
+        dfs = dict(zip(TF_LIST, ex.map(lambda tf: get_ohlcv_ccxt_safe(symbol, tf, limit=limit), TF_LIST)))
+
     for tf in TF_LIST:
-        df: pd.DataFrame = get_ohlcv_ccxt_safe(symbol, tf, limit=limit)
+        df: pd.DataFrame = dfs[tf]
         if df.empty or len(df) < 30:
             continue
 
@@ -110,33 +184,52 @@ def scan_symbol(symbol: str, *, limit: int = 500, confidence_gate: int = 60) ->
             msgs.append(msg)
     return msgs
 
-def run_once():
+async def _scan_all_async(syms: List[str]) -> List[str]:
+    """สแกนทุก symbol พร้อมกัน (ccxt เป็น blocking I/O → โยนเข้า thread)"""
+    results = await asyncio.gather(
+        *[asyncio.to_thread(scan_symbol, sym, limit=500) for sym in syms],
+        return_exceptions=True,
+    )
+    msgs: List[str] = []
+    for sym, res in zip(syms, results):
+        if isinstance(res, Exception):
+            print(f"[ERROR] {sym}: {res}")
+        elif not res:
+            print(f"[SCAN] no signal for {sym}")
+        else:
+            msgs.extend(res)
+    return msgs
+
+async def _run_once_async(syms: List[str]) -> None:
+    msgs = await _scan_all_async(syms)
+    if not msgs:
+        return
+    sent = await _push_many_async(msgs)
+    for m, ok in zip(msgs, sent):
+        # ส่งผ่าน Messaging API ไม่ได้ → ใช้ช่องทางสำรองเดิมทีละข้อความ
+        if not ok:
+            push_line(m)
+        print("[PUSHED]", m.splitlines()[0])
+
+def _symbols() -> List[str]:
     # อ่านรายการสัญลักษณ์จาก .env (เช่น "BTCUSDT,ETHUSDT,SOLUSDT")
     symbols = os.getenv("MTA_SYMBOLS", "BTCUSDT").replace(" ", "")
-    syms = [s for s in symbols.split(",") if s]
+    return [s for s in symbols.split(",") if s]
+
+async def _tick_async() -> None:
+    syms = _symbols()
     print(f"[SCAN] symbols={syms} on {', '.join(TF_LIST)}")
+    try:
+        await _run_once_async(syms)
+    except Exception as e:
+        print(f"[ERROR] scan tick failed: {e}")
 
-    for sym in syms:
-        try:
-            msgs = scan_symbol(sym, limit=500)
-            if not msgs:
-                print(f"[SCAN] no signal for {sym}")
-                continue
-            for m in msgs:
-                push_line(m)
-                print("[PUSHED]", m.splitlines()[0])
-        except Exception as e:
-            print(f"[ERROR] {sym}: {e}")
+def run_once():
+    asyncio.run(_tick_async())
 
 def main():
-    # เริ่มต้นรันทันที 1 รอบ
+    # one-shot: รัน 1 รอบแล้วจบ ให้ตัวตั้งเวลาของแพลตฟอร์ม (Render cron */5) เป็นคนเรียกซ้ำ
     run_once()
-    # ตั้ง schedule ทุก 5 นาที
-    schedule.every(5).minutes.do(run_once)
-    print("✅ Intraday scanner running (every 5 minutes). Press Ctrl+C to stop.")
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
 
 if __name__ == "__main__":
     main()
@@ -2,15 +2,28 @@
 from __future__ import annotations
 
 import argparse
-import sys, os, pathlib, json, subprocess
+import sys, os, pathlib, json
+
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 # ให้ import โปรเจกต์ได้เมื่อรันเป็นสคริปต์
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from scripts.layers.mtf_logic import analyze_mtf
-from scripts.layers.mtf_config import TFS_DEFAULT
+from archive_experiments.layers.mtf_logic import analyze_mtf
+from archive_experiments.layers.mtf_config import TFS_DEFAULT
+from scripts.send_line_message import send as send_line
+from jobs._common import cached_bar_get_data
+
+def _dumps_pretty(payload: dict) -> str:
+    """JSON แบบ indent 2 (orjson ถ้ามี; ไม่มีก็ json มาตรฐาน)"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False, indent=2)
 
 def build_message(summary: str, payload: dict) -> str:
     det = payload.get("details", {})
@@ -31,34 +44,31 @@ def main():
     ap = argparse.ArgumentParser(description="Push MTF (5M/15M/30M) summary to LINE")
     ap.add_argument("symbol", help="เช่น BTCUSDT")
     ap.add_argument("--tfs", default=",".join(TFS_DEFAULT), help="เช่น 5M,15M,30M")
-    ap.add_argument("--send", action="store_true", help="ส่งผ่าน LINE ด้วย scripts/send_line_message.py")
+    ap.add_argument("--send", action="store_true", help="ส่งผ่าน LINE (scripts.send_line_message.send)")
     ap.add_argument("--to", default=os.getenv("LINE_TO"), help="LINE target id (หรือเซ็ต env LINE_TO ไว้)")
     ap.add_argument("--json-out", action="store_true", help="พิมพ์ JSON payload เพิ่มท้าย")
     args = ap.parse_args()
 
     tfs = tuple(x.strip().upper() for x in args.tfs.split(",") if x.strip())
-    summary, payload = analyze_mtf(args.symbol, tfs=tfs)
+    # ข้อมูลแต่ละ TF cache ต่อแท่ง → cron ทุกนาทีไม่ต้องโหลด 30M ใหม่ 30 ครั้ง
+    summary, payload = analyze_mtf(args.symbol, tfs=tfs, data_getter=cached_bar_get_data)
     msg = build_message(summary, payload)
 
     print(msg)
     if args.json_out:
-        print(json.dumps(payload, ensure_ascii=False, indent=2))
+        print(_dumps_pretty(payload))
 
     if args.send:
         if not args.to:
             print("⚠️  ต้องระบุ --to หรือกำหนด env LINE_TO ก่อนส่ง", file=sys.stderr)
             sys.exit(2)
-        # เรียกสคริปต์ส่ง LINE แบบ argument list (กันปัญหา quoting)
-        cmd = [sys.executable, "scripts/send_line_message.py", "--to", args.to, "--text", msg]
+        # ส่งในโปรเซสเดียวกัน (ไม่ต้อง spawn python ใหม่)
         try:
-            subprocess.run(cmd, check=True)
+            send_line(args.to, msg)
             print("✅ sent via LINE")
-        except FileNotFoundError:
-            print("⚠️  ไม่พบ scripts/send_line_message.py", file=sys.stderr)
+        except RuntimeError as e:
+            print(f"⚠️  LINE send failed: {e}", file=sys.stderr)
             sys.exit(1)
-        except subprocess.CalledProcessError as e:
-            print(f"⚠️  LINE command failed: {e}", file=sys.stderr)
-            sys.exit(e.returncode)
 
 if __name__ == "__main__":
     main()
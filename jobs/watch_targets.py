@@ -5,19 +5,35 @@ watch_targets.py
 
 Job สำหรับเฝ้าราคา → ตรวจสอบว่าแตะ TP/SL ของแผนเทรดที่ยังเปิดอยู่หรือไม่
 - ดึง trade plans จาก trade_plan_store
-- ดึงราคาล่าสุดจาก price_provider_binance
+- ราคาล่าสุดมาจาก Binance WebSocket (miniTicker แบบ combined stream) เก็บไว้ใน LAST_PRICE
+  ถ้ายังไม่มีราคาจาก stream → fallback ไปถาม price_provider_binance (REST)
+- เช็คแผนเมื่อ tick ใหม่ข้ามระดับ TP/SL เท่านั้น (index เรียงตามราคา + bisect)
 - ถ้าแตะเป้า → อัปเดตสถานะ (mark_target_hit/mark_closed)
 - ส่งแจ้งเตือนผ่าน notifier_line
 """
 
+import asyncio
+import json
+import os
+import threading
 import time
 import traceback
-from typing import Dict, Any
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, Iterable, Optional
+
+import numpy as np
+
+try:
+    import websocket  # websocket-client
+except Exception:
+    websocket = None
 
 # =============================================================================
 # CONFIG LAYER
 # =============================================================================
 CHECK_INTERVAL = 15  # วินาที, ความถี่ในการเช็คราคา
+BINANCE_WS_URL = "wss://stream.binance.com:9443/stream?streams="
+WS_RECONNECT_SEC = 5
 
 # =============================================================================
 # DATA LAYER
@@ -27,96 +43,301 @@ from app.services import notifier_line
 from app.services import price_provider_binance
 
 
+# ราคาล่าสุดต่อ symbol (เช่น "BTCUSDT") อัปเดตจาก WebSocket thread
+LAST_PRICE: Dict[str, float] = {}
+
+_ws_app = None
+_ws_symbols: frozenset = frozenset()
+
+
+def _norm_symbol(symbol: str) -> str:
+    return (symbol or "").replace("/", "").replace("-", "").upper()
+
+
+def _on_ws_message(_ws, raw: str) -> None:
+    """combined stream ส่งมาเป็น {"stream": ..., "data": {...miniTicker...}}"""
+    try:
+        msg = json.loads(raw)
+        data = msg.get("data", msg)
+        sym, price = data["s"], float(data["c"])
+    except Exception:
+        return
+    LAST_PRICE[sym] = price
+    on_price_tick(sym, price)
+
+
+def start_price_stream(symbols: Iterable[str]) -> bool:
+    """
+    เปิด (หรือเปิดใหม่ถ้าชุด symbol เปลี่ยน) WebSocket หนึ่งเส้นสำหรับทุก symbol
+    รันใน daemon thread, reconnect เองเมื่อหลุด
+    return False ถ้าไม่มี websocket-client
+    """
+    global _ws_app, _ws_symbols
+    if websocket is None:
+        return False
+
+    wanted = frozenset(_norm_symbol(s) for s in symbols if s)
+    if not wanted:
+        return False
+    if _ws_app is not None and wanted == _ws_symbols:
+        return True
+    if _ws_app is not None:
+        _ws_app.close()
+
+    streams = "/".join(f"{s.lower()}@miniTicker" for s in sorted(wanted))
+    _ws_app = websocket.WebSocketApp(BINANCE_WS_URL + streams, on_message=_on_ws_message)
+    _ws_symbols = wanted
+    threading.Thread(
+        target=_ws_app.run_forever,
+        kwargs={"ping_interval": 60, "reconnect": WS_RECONNECT_SEC},
+        name="binance-ws",
+        daemon=True,
+    ).start()
+    return True
+
+
 def get_current_price(symbol: str) -> float:
-    """ดึงราคาล่าสุดของ symbol"""
+    """ราคาล่าสุดของ symbol: ใช้ค่าจาก stream ถ้ามี ไม่งั้นถาม REST"""
+    px = LAST_PRICE.get(_norm_symbol(symbol))
+    if px is not None:
+        return px
     return price_provider_binance.get_price(symbol)
 
 
 # =============================================================================
 # SERVICE LAYER
 # =============================================================================
-def check_plan(plan: Dict[str, Any]) -> None:
+# เป้า → (ไอคอนข้อความ, เหตุผลปิดแผน หรือ None ถ้าไม่ปิด); ลำดับ dict = ลำดับการเช็ค/แจ้งเตือน
+_TARGET_ACTIONS = {
+    "tp1": ("✅", None),
+    "tp2": ("✅", None),
+    "tp3": ("🏆", "TP3 reached"),
+    "sl": ("❌", "Stop Loss"),
+}
+
+
+def _apply_targets(
+    ts: str,
+    symbol: str,
+    levels: Dict[str, float],
+    hit_flags: Dict[str, bool],
+    price: float,
+    plan: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    ทำเครื่องหมายเป้าที่โดน / ปิดแผน / แจ้งเตือน (ใช้ร่วมกันทั้ง check_plan และ check_all_plans)
+    - plan (ถ้ามี) = dict ในหน่วยความจำ อัปเดตตาม store ด้วย (trigger index ถือ dict เดียวกันอยู่)
+    """
+    hit_messages = []
+    for target, (icon, close_reason) in _TARGET_ACTIONS.items():
+        if not hit_flags.get(target):
+            continue
+        trade_plan_store.mark_target_hit(ts, target)
+        if plan is not None:
+            plan[f"{target}_hit"] = "1"
+        msg = f"{icon} {target.upper()} {levels[target]} hit @ {price}"
+        if close_reason:
+            trade_plan_store.mark_closed(ts, close_reason)
+            if plan is not None:
+                plan["closed_at"] = close_reason
+            msg += " → Plan Closed"
+        hit_messages.append(msg)
+
+    # แจ้งเตือนทุกเป้าที่โดน (รวมเป็น push เดียว)
+    if hit_messages:
+        notifier_line.send_messages([f"[{symbol}] {msg}" for msg in hit_messages])
+
+
+def check_plan(plan: Dict[str, Any], price: Optional[float] = None) -> None:
     """
     ตรวจสอบแผนเทรดเดี่ยวว่ามีการแตะ TP/SL หรือยัง
+    - price=None → ดึงราคาล่าสุดเอง
     """
     symbol = plan["symbol"]
-    ts = plan["timestamp"]
+    if plan.get("closed_at"):
+        return
 
-    try:
-        price = get_current_price(symbol)
-    except Exception as e:
-        print(f"⚠️ error fetching price {symbol}: {e}")
+    if price is None:
+        try:
+            price = get_current_price(symbol)
+        except Exception as e:
+            print(f"⚠️ error fetching price {symbol}: {e}")
+            return
+
+    # LONG: ราคา >= TP / <= SL ; SHORT: กลับด้าน → คูณ sign แล้วใช้ >= เดียวกัน
+    sign = {"LONG": 1, "SHORT": -1}.get(plan.get("direction", "").upper())
+    if sign is None:
         return
+    levels = {t: float(plan.get(t) or 0) for t in _TARGET_ACTIONS}
+    sp = sign * price
+    hit_flags = {
+        t: not plan.get(f"{t}_hit") and lv > 0 and (sp <= sign * lv if t == "sl" else sp >= sign * lv)
+        for t, lv in levels.items()
+    }
+    _apply_targets(plan["timestamp"], symbol, levels, hit_flags, price, plan)
 
-    # ดึงค่าเป้าหมาย
-    entry = float(plan.get("entry") or 0)
-    tp1 = float(plan.get("tp1") or 0)
-    tp2 = float(plan.get("tp2") or 0)
-    tp3 = float(plan.get("tp3") or 0)
-    sl = float(plan.get("sl") or 0)
-    direction = plan.get("direction", "").upper()
 
-    hit_messages = []
+# symbol → (levels เรียงจากน้อยไปมาก, plan ที่ตรงกับแต่ละ level)
+_TRIGGERS: Dict[str, tuple] = {}
+_PREV_PRICE: Dict[str, float] = {}
 
-    if direction == "SHORT":
-        if not plan.get("tp1_hit") and price <= tp1 and tp1 > 0:
-            trade_plan_store.mark_target_hit(ts, "tp1")
-            hit_messages.append(f"✅ TP1 {tp1} hit @ {price}")
-        if not plan.get("tp2_hit") and price <= tp2 and tp2 > 0:
-            trade_plan_store.mark_target_hit(ts, "tp2")
-            hit_messages.append(f"✅ TP2 {tp2} hit @ {price}")
-        if not plan.get("tp3_hit") and price <= tp3 and tp3 > 0:
-            trade_plan_store.mark_target_hit(ts, "tp3")
-            trade_plan_store.mark_closed(ts, "TP3 reached")
-            hit_messages.append(f"🏆 TP3 {tp3} hit @ {price} → Plan Closed")
-        if not plan.get("sl_hit") and price >= sl and sl > 0:
-            trade_plan_store.mark_target_hit(ts, "sl")
-            trade_plan_store.mark_closed(ts, "Stop Loss")
-            hit_messages.append(f"❌ SL {sl} hit @ {price} → Plan Closed")
-
-    elif direction == "LONG":
-        if not plan.get("tp1_hit") and price >= tp1 and tp1 > 0:
-            trade_plan_store.mark_target_hit(ts, "tp1")
-            hit_messages.append(f"✅ TP1 {tp1} hit @ {price}")
-        if not plan.get("tp2_hit") and price >= tp2 and tp2 > 0:
-            trade_plan_store.mark_target_hit(ts, "tp2")
-            hit_messages.append(f"✅ TP2 {tp2} hit @ {price}")
-        if not plan.get("tp3_hit") and price >= tp3 and tp3 > 0:
-            trade_plan_store.mark_target_hit(ts, "tp3")
-            trade_plan_store.mark_closed(ts, "TP3 reached")
-            hit_messages.append(f"🏆 TP3 {tp3} hit @ {price} → Plan Closed")
-        if not plan.get("sl_hit") and price <= sl and sl > 0:
-            trade_plan_store.mark_target_hit(ts, "sl")
-            trade_plan_store.mark_closed(ts, "Stop Loss")
-            hit_messages.append(f"❌ SL {sl} hit @ {price} → Plan Closed")
-
-    # แจ้งเตือนทุกเป้าที่โดน
-    for msg in hit_messages:
-        notifier_line.send_message(f"[{symbol}] {msg}")
+
+def rebuild_triggers(plans: Iterable[Dict[str, Any]]) -> None:
+    """
+    สร้าง index ระดับราคา TP/SL ที่ยังไม่โดนของแต่ละ symbol
+    index ถูกสร้างใหม่ทั้งก้อนแล้วสลับทีเดียว จึงอ่านจาก WS thread ได้โดยไม่ต้อง lock
+    """
+    grouped: Dict[str, list] = {}
+    for plan in plans:
+        if plan.get("closed_at"):
+            continue
+        sym = _norm_symbol(plan.get("symbol", ""))
+        for target in ("tp1", "tp2", "tp3", "sl"):
+            level = float(plan.get(target) or 0)
+            if level > 0 and not plan.get(f"{target}_hit"):
+                grouped.setdefault(sym, []).append((level, plan))
+
+    triggers = {}
+    for sym, items in grouped.items():
+        items.sort(key=lambda t: t[0])
+        triggers[sym] = ([lv for lv, _ in items], [pl for _, pl in items])
+
+    global _TRIGGERS
+    _TRIGGERS = triggers
+    # ราคาก่อนหน้าไม่ใช้ข้าม index: tick แรกหลัง rebuild จะเช็คทุกแผนของ symbol นั้น
+    _PREV_PRICE.clear()
+
+
+def on_price_tick(symbol: str, price: float) -> None:
+    """
+    เรียกจาก WS callback: เช็คเฉพาะแผนที่มี level อยู่ระหว่างราคาก่อนหน้ากับราคานี้
+    """
+    prev = _PREV_PRICE.get(symbol)
+    _PREV_PRICE[symbol] = price
+    entry = _TRIGGERS.get(symbol)
+    if not entry:
+        return
+    levels, plans = entry
+
+    if prev is None:
+        hit = plans
+    else:
+        lo, hi = (prev, price) if prev <= price else (price, prev)
+        hit = plans[bisect_left(levels, lo):bisect_right(levels, hi)]
+
+    seen = set()
+    for plan in hit:
+        if id(plan) in seen:
+            continue
+        seen.add(id(plan))
+        try:
+            check_plan(plan, price)
+        except Exception:
+            traceback.print_exc()
+
+
+def _plan_prices(symbols: np.ndarray) -> np.ndarray:
+    """
+    ราคาต่อแผน: ใช้ LAST_PRICE จาก stream ก่อน
+    symbol ที่ยังไม่มี → ถาม REST แบบ batch ครั้งเดียว (get_price_many) แล้วค่อยถามทีละตัวถ้ายังขาด
+    ดึงไม่ได้ → NaN
+    """
+    px: Dict[str, float] = {}
+    missing = []
+    for sym in set(symbols):
+        v = LAST_PRICE.get(_norm_symbol(sym))
+        if v is not None:
+            px[sym] = v
+        else:
+            missing.append(sym)
+
+    if missing:
+        try:
+            batch = asyncio.run(price_provider_binance.get_price_many(missing))
+        except Exception as e:
+            print(f"⚠️ batch price fetch failed: {e}")
+            batch = {}
+        for sym in missing:
+            v = batch.get(_norm_symbol(sym))
+            if v is None:
+                try:
+                    v = get_current_price(sym)
+                except Exception as e:
+                    print(f"⚠️ error fetching price {sym}: {e}")
+                    v = np.nan
+            px[sym] = v
+    return np.array([px[s] for s in symbols], dtype=np.float64)
 
 
 def check_all_plans() -> None:
-    """ตรวจสอบแผนทั้งหมดที่ยังเปิดอยู่"""
-    plans = trade_plan_store.list_trade_plans(open_only=True)
-    if not plans:
+    """
+    ตรวจสอบแผนทั้งหมดที่ยังเปิดอยู่พร้อมกันแบบ vectorized
+    (เงื่อนไขเดียวกับ check_plan: คูณ direction_sign เพื่อใช้ >= เดียวกันทั้ง LONG/SHORT)
+    """
+    arr = trade_plan_store.snapshot_arrays(open_only=True)
+    if not len(arr["timestamp"]):
         print("ℹ️ no open trade plans")
         return
 
-    for plan in plans:
+    start_price_stream(arr["symbol"])
+
+    price = _plan_prices(arr["symbol"])
+    sign = arr["direction_sign"]
+    valid = (sign != 0) & ~np.isnan(price)
+    sp = sign * price
+
+    hits = {}
+    for t in ("tp1", "tp2", "tp3"):
+        hits[t] = valid & (arr[t] > 0) & (sp >= sign * arr[t]) & ~arr[f"{t}_hit"]
+    hits["sl"] = valid & (arr["sl"] > 0) & (sp <= sign * arr["sl"]) & ~arr["sl_hit"]
+
+    any_hit = hits["tp1"] | hits["tp2"] | hits["tp3"] | hits["sl"]
+    for i in np.nonzero(any_hit)[0]:
         try:
-            check_plan(plan)
+            _apply_hits(arr, hits, int(i), float(price[i]))
         except Exception:
             traceback.print_exc()
 
 
+def _apply_hits(arr: Dict[str, np.ndarray], hits: Dict[str, np.ndarray], i: int, price: float) -> None:
+    """แถว i ของ snapshot → _apply_targets (ตัวเดียวกับ check_plan)"""
+    _apply_targets(
+        arr["timestamp"][i],
+        arr["symbol"][i],
+        {t: float(arr[t][i]) for t in _TARGET_ACTIONS},
+        {t: bool(hits[t][i]) for t in _TARGET_ACTIONS},
+        price,
+    )
+
+
 # =============================================================================
 # RUNNER LAYER
 # =============================================================================
+def _plans_mtime() -> float:
+    try:
+        return os.path.getmtime(trade_plan_store.FILE_PATH)
+    except OSError:
+        return 0.0
+
+
 def run_loop() -> None:
-    """วน loop ตรวจสอบทุกๆ CHECK_INTERVAL วินาที"""
+    """
+    ตรวจ TP/SL แบบ event-driven จาก WS tick
+    loop นี้แค่ rebuild trigger index เมื่อไฟล์แผนเปลี่ยน
+    ถ้าไม่มี websocket-client → กลับไปใช้ polling ทุก CHECK_INTERVAL วินาทีแบบเดิม
+    """
     print("🚀 starting watch_targets loop...")
+    last_mtime = None
     while True:
-        check_all_plans()
+        if websocket is None:
+            check_all_plans()
+        else:
+            mtime = _plans_mtime()
+            if mtime != last_mtime:
+                plans = trade_plan_store.list_trade_plans(open_only=True)
+                rebuild_triggers(plans)
+                start_price_stream(p.get("symbol") for p in plans)
+                last_mtime = mtime
         time.sleep(CHECK_INTERVAL)
 
 
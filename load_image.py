@@ -1,43 +1,66 @@
+import argparse
+import os
 import cv2
 import pytesseract
-import re
-import matplotlib.pyplot as plt
 
-# 1) โหลดรูป
-img = cv2.imread("wave_chart.png")
+# DEBUG=1 หรือ --debug → เขียนภาพระหว่างทาง (gray/thresh) และเปิดภาพสุดท้ายด้วย matplotlib
+DEBUG = os.getenv("DEBUG", "0") == "1"
+# ย่อภาพก่อน OCR (งานของ tesseract โตตามจำนวน pixel)
+OCR_SCALE = float(os.getenv("OCR_SCALE", "0.5"))
+# ตัวอักษรที่นับเป็นเลขคลื่น (ใช้ทั้ง whitelist ของ tesseract และตอนกรองผล)
+WAVE_CHARS = "12345ABC"
+_WAVE_SET = frozenset(WAVE_CHARS)
 
-if img is None:
-    print("❌ ไม่เจอไฟล์ wave_chart.png - เช็ค path อีกครั้ง")
-    exit()
 
-print("✅ โหลดรูปสำเร็จ ขนาด:", img.shape)
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="OCR เลขคลื่น (12345ABC) จาก wave_chart.png")
+    ap.add_argument("--debug", action="store_true", help="บันทึกภาพระหว่างทาง + แสดงภาพที่ใช้ OCR")
+    args = ap.parse_args(argv)
+    debug = DEBUG or args.debug
 
-# 2) แปลงเป็น grayscale
-gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-cv2.imwrite("gray.png", gray)
+    # 1) โหลดรูป
+    img = cv2.imread("wave_chart.png")
 
-# 3) Blur + Threshold ให้ตัวเลขชัดขึ้น
-blur = cv2.GaussianBlur(gray, (5, 5), 0)
-_, thresh = cv2.threshold(blur, 150, 255, cv2.THRESH_BINARY)
-cv2.imwrite("thresh.png", thresh)
+    if img is None:
+        print("❌ ไม่เจอไฟล์ wave_chart.png - เช็ค path อีกครั้ง")
+        return 1
 
-# 4) Invert สี (กลับดำ ↔ ขาว)
-invert = cv2.bitwise_not(thresh)
-cv2.imwrite("invert.png", invert)
+    print("✅ โหลดรูปสำเร็จ ขนาด:", img.shape)
 
-# 5) OCR โดย whitelist เฉพาะตัวเลข/อักษร 12345ABC
-custom_config = r'-c tessedit_char_whitelist=12345ABC --psm 6'
-text = pytesseract.image_to_string(invert, config=custom_config)
+    # 2) ย่อภาพ + แปลงเป็น grayscale
+    if OCR_SCALE != 1.0:
+        img = cv2.resize(img, None, fx=OCR_SCALE, fy=OCR_SCALE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-print("\n📜 OCR Output (Raw):")
-print(text)
+    # 3) Adaptive threshold (Gaussian) + invert สีในคำสั่งเดียว (THRESH_BINARY_INV)
+    invert = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2
+    )
+    if debug:
+        cv2.imwrite("debug_gray.png", gray)
+        cv2.imwrite("debug_thresh.png", invert)
 
-# 6) ดึงเฉพาะตัวเลข/อักษรที่เป็น Wave
-waves = re.findall(r"[12345ABC]", text)
-print("\n🎯 Detected Waves:", waves)
+    # 4) OCR โดย whitelist เฉพาะตัวเลข/อักษร 12345ABC
+    custom_config = f"-c tessedit_char_whitelist={WAVE_CHARS} --psm 6"
+    text = pytesseract.image_to_string(invert, config=custom_config)
 
-# 7) แสดงภาพสุดท้ายที่ใช้ OCR
-plt.imshow(invert, cmap="gray")
-plt.title("Image used for OCR (invert)")
-plt.axis("off")
-plt.show()
+    print("\n📜 OCR Output (Raw):")
+    print(text)
+
+    # 5) ดึงเฉพาะตัวเลข/อักษรที่เป็น Wave
+    waves = [c for c in text if c in _WAVE_SET]
+    print("\n🎯 Detected Waves:", waves)
+
+    # 6) แสดงภาพสุดท้ายที่ใช้ OCR (เฉพาะโหมด debug; import matplotlib เฉพาะตอนนี้)
+    if debug:
+        import matplotlib.pyplot as plt
+
+        plt.imshow(invert, cmap="gray")
+        plt.title("Image used for OCR (invert)")
+        plt.axis("off")
+        plt.show()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,24 @@
+# run_all.py
+"""
+รันขั้นตอนรายวันต่อกันในโปรเซสเดียว
+1) scripts/build_historical_binance.py → อัปเดต app/data/historical.xlsx
+2) jobs/push_btc_hourly.py            → วิเคราะห์ + push LINE
+
+เรียก main() ของแต่ละขั้นโดยตรง (ไม่ spawn python ใหม่) → pandas/numpy/openpyxl import ครั้งเดียว
+
+ใช้งาน:
+  PYTHONPATH=. python run_all.py
+"""
+import sys
+
+from scripts.build_historical_binance import main as build
+from jobs.push_btc_hourly import main as push
+
+
+def main() -> int:
+    build()
+    return push() or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,105 @@
 # --- scripts/analyze_chart.py (DROP-IN REPLACE/วางทับไฟล์เดิมทั้งก้อน) ---
+import os
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
 
+try:
+    import python_calamine  # optional: reader xlsx ที่เขียนด้วย Rust (pandas engine="calamine")
+except Exception:
+    python_calamine = None
+
+try:
+    from numba import njit  # optional: JIT ให้ loop อินดิเคเตอร์ด้านล่าง
+except Exception:
+    njit = None
+
 PATH = "app/data/historical.xlsx"
+PARQUET_PATH = "app/data/historical.parquet"  # dataset partition ตามชื่อชีท (เขียนโดย jobs/daily_btc_analysis.py)
+EMA_WARMUP = 200 * 3  # แท่งย้อนหลังที่ใช้คำนวณอินดิเคเตอร์ (EMA200 ลู่เข้าแล้ว)
+FIB_RATIOS = np.array([0.0, 0.236, 0.382, 0.5, 0.618, 1.0])
+FIB_LABELS = ("0%", "23.6%", "38.2%", "50%", "61.8%", "100%")
+XLSX_ENGINE = "calamine" if python_calamine is not None else "openpyxl"
+
+def _indicators_last(close):
+    """
+    EMA20/50/200 + RSI14 + MACD(12/26/9) ของแท่งสุดท้ายในลูปเดียวบน float64 array
+    (ewm adjust=False, RSI แบบ rolling mean; scalar accumulator ไม่เขียน array ทั้งเส้น)
+    คืน array (7,) เรียงตาม INDICATOR_NAMES
+    """
+    n = close.shape[0]
+    out = np.full(7, np.nan)
+    if n == 0:
+        return out
+    a20, a50, a200 = 2.0 / 21.0, 2.0 / 51.0, 2.0 / 201.0
+    a12, a26, a9 = 2.0 / 13.0, 2.0 / 27.0, 2.0 / 10.0
+    e20 = e50 = e200 = e12 = e26 = close[0]
+    sig = e12 - e26
+    for i in range(1, n):
+        x = close[i]
+        e20 = a20 * x + (1.0 - a20) * e20
+        e50 = a50 * x + (1.0 - a50) * e50
+        e200 = a200 * x + (1.0 - a200) * e200
+        e12 = a12 * x + (1.0 - a12) * e12
+        e26 = a26 * x + (1.0 - a26) * e26
+        sig = a9 * (e12 - e26) + (1.0 - a9) * sig
+    m = e12 - e26
+    out[0] = e20
+    out[1] = e50
+    out[2] = e200
+    out[4] = m
+    out[5] = sig
+    out[6] = m - sig
+
+    # RSI14 แท่งสุดท้าย = ค่าเฉลี่ย gain/loss ของ 14 diff ล่าสุด (diff แรกของทั้งเส้นนับเป็น 0)
+    if n >= 14:
+        sum_g = 0.0
+        sum_l = 0.0
+        for i in range(n - 14, n):
+            if i == 0:
+                continue
+            d = close[i] - close[i - 1]
+            if d > 0:
+                sum_g += d
+            elif d < 0:
+                sum_l -= d
+        if sum_l == 0.0:
+            out[3] = np.nan if sum_g == 0.0 else 100.0
+        else:
+            out[3] = 100.0 - 100.0 / (1.0 + sum_g / sum_l)
+    return out
+
+if njit is not None:
+    _indicators_last = njit(cache=True, fastmath=True)(_indicators_last)
+
+INDICATOR_NAMES = ("EMA20", "EMA50", "EMA200", "RSI14", "MACD", "Signal", "Hist")
+
+def last_indicators(close):
+    """ค่าอินดิเคเตอร์ของแท่งสุดท้ายเท่านั้น → dict ตาม INDICATOR_NAMES"""
+    vals = _indicators_last(np.asarray(close, dtype=np.float64))
+    return dict(zip(INDICATOR_NAMES, (float(v) for v in vals)))
+
+@lru_cache(maxsize=1)
+def _load_workbook():
+    """อ่านทุกชีทของ PATH ครั้งเดียว (parse zip ทั้งไฟล์ทุกครั้งที่เรียก; ใช้ calamine ถ้ามี)"""
+    return pd.read_excel(PATH, sheet_name=None, engine=XLSX_ENGINE)
 
-def ema(series, period):
-    return series.ewm(span=period, adjust=False).mean()
-
-def rsi(series, period=14):
-    delta = series.diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
-
-def macd(series, fast=12, slow=26, signal=9):
-    ema_fast = series.ewm(span=fast, adjust=False).mean()
-    ema_slow = series.ewm(span=slow, adjust=False).mean()
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    hist = macd_line - signal_line
-    return macd_line, signal_line, hist
+def _load_sheet(sheet):
+    """ใช้ partition Parquet ของชีทถ้ามี ไม่งั้นดึงจาก workbook ที่แคชไว้"""
+    part = os.path.join(PARQUET_PATH, f"sheet={sheet}")
+    if os.path.isdir(part):
+        return pd.read_parquet(part)
+    return _load_workbook()[sheet].copy()
 
 def analyze_sheet(sheet, window=30):
-    df = pd.read_excel(PATH, sheet_name=sheet)
+    df = _load_sheet(sheet)
     df["timestamp"] = pd.to_datetime(df["timestamp"])
     df = df.sort_values("timestamp").reset_index(drop=True)
+    # ใช้แค่ช่วงท้ายพอให้ EMA200 warmup (3 เท่าของ period) ไม่ต้องคำนวณทั้งประวัติ
+    df = df.tail(max(EMA_WARMUP, window) + 5).reset_index(drop=True)
 
-    df["EMA20"] = ema(df["close"], 20)
-    df["EMA50"] = ema(df["close"], 50)
-    df["EMA200"] = ema(df["close"], 200)
-    df["RSI14"] = rsi(df["close"], 14)
-    df["MACD"], df["Signal"], df["Hist"] = macd(df["close"])
+    ind = last_indicators(df["close"].to_numpy())
 
     last = df.iloc[-1]
     prev = df.iloc[-2]
@@ -45,21 +111,14 @@ def analyze_sheet(sheet, window=30):
     swing_low = sw["low"].min()
     swing_high = sw["high"].max()
     diff = swing_high - swing_low
-    fib_levels = {
-        "0%": swing_high,
-        "23.6%": swing_high - 0.236*diff,
-        "38.2%": swing_high - 0.382*diff,
-        "50%": swing_high - 0.5*diff,
-        "61.8%": swing_high - 0.618*diff,
-        "100%": swing_low
-    }
+    fib_levels = dict(zip(FIB_LABELS, swing_high - diff * FIB_RATIOS))
 
     lines = []
     lines.append(f"=== {sheet} ===")
     lines.append(f"Last candle {last['timestamp']:%Y-%m-%d %H:%M:%S}  O:{last['open']:.2f} H:{last['high']:.2f} L:{last['low']:.2f} C:{last['close']:.2f} Vol:{last['volume']:.2f}")
-    lines.append(f"EMA20={last['EMA20']:.2f}  EMA50={last['EMA50']:.2f}  EMA200={last['EMA200']:.2f}")
-    lines.append(f"RSI14={last['RSI14']:.2f}")
-    lines.append(f"MACD={last['MACD']:.2f}  Signal={last['Signal']:.2f}  Hist={last['Hist']:.2f}")
+    lines.append(f"EMA20={ind['EMA20']:.2f}  EMA50={ind['EMA50']:.2f}  EMA200={ind['EMA200']:.2f}")
+    lines.append(f"RSI14={ind['RSI14']:.2f}")
+    lines.append(f"MACD={ind['MACD']:.2f}  Signal={ind['Signal']:.2f}  Hist={ind['Hist']:.2f}")
     lines.append(f"Support≈{s1:.2f}  Resistance≈{r1:.2f}")
     lines.append("Fib levels (30 candles swing):")
     for k, v in fib_levels.items():
@@ -1,7 +1,35 @@
+import numpy as np
 import pandas as pd
 
-# โหลดไฟล์ผล backtest
-df = pd.read_csv("backtest/results_elliott.csv")
+try:
+    from pyarrow import csv as pacsv
+except Exception:
+    pacsv = None
+
+
+def confusion_table(actual: pd.Series, predicted: pd.Series) -> pd.DataFrame:
+    """
+    ตาราง Actual x Predicted แบบเดียวกับ pd.crosstab
+    แต่แปลงเป็น categorical code ชุด label เดียวกันครั้งเดียว แล้วนับด้วย np.bincount
+    """
+    labels = sorted(set(actual.dropna()) | set(predicted.dropna()))
+    k = len(labels)
+    a = pd.Categorical(actual, categories=labels).codes
+    p = pd.Categorical(predicted, categories=labels).codes
+    ok = (a >= 0) & (p >= 0)
+    a, p = a[ok], p[ok]
+    cm = np.bincount(a * k + p, minlength=k * k).reshape(k, k)
+    rows, cols = np.unique(a), np.unique(p)
+    return pd.DataFrame(
+        cm[np.ix_(rows, cols)],
+        index=pd.Index([labels[i] for i in rows], name="Actual"),
+        columns=pd.Index([labels[i] for i in cols], name="Predicted"),
+    )
+
+
+# โหลดไฟล์ผล backtest (pyarrow CSV reader ถ้ามี)
+CSV_PATH = "backtest/results_elliott.csv"
+df = pacsv.read_csv(CSV_PATH).to_pandas() if pacsv is not None else pd.read_csv(CSV_PATH)
 
 # --- 1) สร้าง mapping จากคลื่น -> ทิศทางตลาด ---
 mapping = {
@@ -32,7 +60,7 @@ print(df.groupby("pred_direction")["hit_mapped"].mean() * 100)
 
 # --- 5) Confusion Table (เปรียบเทียบจริง vs ทำนาย) ---
 print("\nConfusion Table (Actual vs Predicted):")
-print(pd.crosstab(df["real_trend"], df["pred_direction"], rownames=["Actual"], colnames=["Predicted"]))
+print(confusion_table(df["real_trend"], df["pred_direction"]))
 
 # --- 6) แสดงตัวอย่างผลลัพธ์บางส่วน ---
 print("\nSample Predictions:")
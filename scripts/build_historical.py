@@ -2,6 +2,13 @@ import os
 import pandas as pd
 import yfinance as yf
 
+try:
+    import numexpr as ne  # optional: ประเมิน mask ในรอบเดียวแบบแบ่ง chunk
+except Exception:
+    ne = None
+
+from scripts.build_historical_binance import write_sheets_xlsx
+
 OUT_PATH = "app/data/historical.xlsx"
 SYMBOL = "BTC-USD"  # จาก Yahoo
 SHEETS = {
@@ -39,6 +46,16 @@ def _download(symbol: str, start: str, interval: str) -> pd.DataFrame:
             continue
     return pd.concat(parts).sort_index() if parts else pd.DataFrame()
 
+def _sane_ohlcv_mask(out: pd.DataFrame):
+    """
+    low ≤ open/close ≤ high และ volume ≥ 0 → mask เดียว
+    ทำบน numpy array ตรงๆ (ไม่สร้าง boolean Series ทีละเงื่อนไข); มี numexpr → ผ่านข้อมูลรอบเดียว
+    """
+    o, h, l, c, v = (out[col].to_numpy() for col in ["open", "high", "low", "close", "volume"])
+    if ne is not None:
+        return ne.evaluate("(l <= o) & (l <= c) & (h >= o) & (h >= c) & (v >= 0)")
+    return (l <= o) & (l <= c) & (h >= o) & (h >= c) & (v >= 0)
+
 def _normalize_from_index(df: pd.DataFrame) -> pd.DataFrame:
     """
     แปลง DataFrame จาก yfinance ให้เป็นคอลัมน์มาตรฐาน:
@@ -62,15 +79,9 @@ def _normalize_from_index(df: pd.DataFrame) -> pd.DataFrame:
     # ล้าง NaN ที่จำเป็น
     out = out.dropna(subset=["timestamp", "open", "high", "low", "close", "volume"])
     # sanity check
-    out = out[
-        (out["low"] <= out["open"]) &
-        (out["low"] <= out["close"]) &
-        (out["high"] >= out["open"]) &
-        (out["high"] >= out["close"]) &
-        (out["volume"] >= 0)
-    ]
-    # เรียงเวลา + ไม่ซ้ำ
-    out = out.sort_values("timestamp").drop_duplicates(subset=["timestamp"])
+    out = out[_sane_ohlcv_mask(out)]
+    # เรียงเวลา + ไม่ซ้ำ (ข้อมูลเกือบเรียงอยู่แล้ว → mergesort แบบ stable; เวลาซ้ำเก็บแถวหลังสุด)
+    out = out.sort_values("timestamp", kind="mergesort").drop_duplicates(subset=["timestamp"], keep="last", ignore_index=True)
     return out
 
 def _resample_ohlcv(df_1h: pd.DataFrame, rule: str) -> pd.DataFrame:
@@ -97,36 +108,39 @@ def _resample_ohlcv(df_1h: pd.DataFrame, rule: str) -> pd.DataFrame:
 
 def build_excel():
     print(f"Saving to: {OUT_PATH}")
-    with pd.ExcelWriter(OUT_PATH, engine="openpyxl") as writer:
-        # 1D
-        cfg = SHEETS["BTCUSDT_1D"]
-        raw_1d = _download(SYMBOL, cfg["start"], cfg["interval"])
-        df_1d = _normalize_from_index(raw_1d)
-        if df_1d.empty:
-            print("⚠️  BTCUSDT_1D: no data")
-        else:
-            df_1d.to_excel(writer, sheet_name="BTCUSDT_1D", index=False)
-            print(f"✅  BTCUSDT_1D rows={len(df_1d)}")
-
-        # 1H (ฐานสำหรับ 4H)
-        cfg = SHEETS["BTCUSDT_1H"]
-        raw_1h = _download(SYMBOL, cfg["start"], cfg["interval"])
-        df_1h = _normalize_from_index(raw_1h)
-        if df_1h.empty:
-            print("⚠️  BTCUSDT_1H: no data")
+    # รวบรวมทุกชีทก่อน แล้วเขียนครั้งเดียวแบบ stream (xlsxwriter constant_memory)
+    frames = {}
+
+    # 1D
+    cfg = SHEETS["BTCUSDT_1D"]
+    raw_1d = _download(SYMBOL, cfg["start"], cfg["interval"])
+    df_1d = _normalize_from_index(raw_1d)
+    if df_1d.empty:
+        print("⚠️  BTCUSDT_1D: no data")
+    else:
+        frames["BTCUSDT_1D"] = df_1d
+        print(f"✅  BTCUSDT_1D rows={len(df_1d)}")
+
+    # 1H (ฐานสำหรับ 4H)
+    cfg = SHEETS["BTCUSDT_1H"]
+    raw_1h = _download(SYMBOL, cfg["start"], cfg["interval"])
+    df_1h = _normalize_from_index(raw_1h)
+    if df_1h.empty:
+        print("⚠️  BTCUSDT_1H: no data")
+    else:
+        frames["BTCUSDT_1H"] = df_1h
+        print(f"✅  BTCUSDT_1H rows={len(df_1h)}")
+
+    # 4H (resample จาก 1H)
+    if not df_1h.empty:
+        df_4h = _resample_ohlcv(df_1h, "4H")
+        if df_4h.empty:
+            print("⚠️  BTCUSDT_4H: resample empty")
         else:
-            df_1h.to_excel(writer, sheet_name="BTCUSDT_1H", index=False)
-            print(f"✅  BTCUSDT_1H rows={len(df_1h)}")
-
-        # 4H (resample จาก 1H)
-        if not df_1h.empty:
-            df_4h = _resample_ohlcv(df_1h, "4H")
-            if df_4h.empty:
-                print("⚠️  BTCUSDT_4H: resample empty")
-            else:
-                df_4h.to_excel(writer, sheet_name="BTCUSDT_4H", index=False)
-                print(f"✅  BTCUSDT_4H rows={len(df_4h)}")
+            frames["BTCUSDT_4H"] = df_4h
+            print(f"✅  BTCUSDT_4H rows={len(df_4h)}")
 
+    write_sheets_xlsx(OUT_PATH, frames)
     print(f"🎉 Saved -> {OUT_PATH}")
 
 if __name__ == "__main__":
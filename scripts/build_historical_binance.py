@@ -5,11 +5,20 @@
 
 from __future__ import annotations
 import os
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import pandas as pd
+import pyarrow as pa
 from datetime import datetime, timezone
 
+try:
+    import xlsxwriter  # writer แบบ stream (constant_memory) เร็วกว่า openpyxl มาก
+except Exception:
+    xlsxwriter = None
+
 OUT_PATH = "app/data/historical.xlsx"
 SYMBOL = "BTCUSDT"
 
@@ -29,11 +38,86 @@ INTERVALS = {
 
 BINANCE_KLINES_URL = "https://api.binance.com/api/v3/klines"
 
+KLINE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+_TS_TYPE = pa.timestamp("ms", tz="UTC")
+_KLINE_SCHEMA = pa.schema(
+    [("timestamp", _TS_TYPE)] + [(c, pa.float64()) for c in KLINE_COLUMNS[1:]]
+)
+
+# ดาวน์โหลดหลายช่วงเวลาพร้อมกัน แต่จำกัด request ที่ค้างอยู่รวมทุก interval
+# (klines limit=1000 ใช้ weight 2 จากโควตา 1200/นาที → ห้ามยิงไม่อั้น)
+KLINE_WORKERS = int(os.getenv("BINANCE_KLINE_WORKERS", "4"))
+_HTTP_SLOTS = threading.BoundedSemaphore(int(os.getenv("BINANCE_MAX_INFLIGHT", "6")))
+_tls = threading.local()
+
+class TokenBucket:
+    """
+    จำกัดอัตรา request รวมทุก thread: จองช่องเวลาถัดไปใต้ lock แล้วค่อย sleep นอก lock
+    sleep เฉพาะเมื่อยิงเร็วกว่า rps จริงๆ (แทน sleep คงที่หลังทุก request)
+    """
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps
+        self.next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next)
+            self.next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# weight 2 ต่อ request → เพดาน 10 req/s; เผื่อไว้ที่ 8
+_BUCKET = TokenBucket(float(os.getenv("BINANCE_RPS", "8")))
+
 def _ms(dt: datetime) -> int:
     return int(dt.timestamp() * 1000)
 
-def _fetch_klines(symbol: str, interval: str, start: datetime, end: datetime, limit: int = 1000) -> list:
-    out = []
+def _page_to_batch(data: list) -> pa.RecordBatch:
+    """
+    แปลง klines หนึ่งหน้า (≤ limit แถว) เป็น RecordBatch แบบคอลัมน์
+    ราคา/volume เป็น string จาก Binance → ให้ Arrow cast เป็น float64 ในโค้ด C (ไม่ผ่าน pd.to_numeric ทีละช่อง)
+    """
+    cols = list(zip(*data))
+    arrays = [pa.array(cols[0], type=pa.int64()).cast(_TS_TYPE)]
+    arrays += [pa.array(cols[i], type=pa.string()).cast(pa.float64()) for i in range(1, 6)]
+    return pa.RecordBatch.from_arrays(arrays, schema=_KLINE_SCHEMA)
+
+def _session() -> requests.Session:
+    # requests.Session ไม่ thread-safe เต็มที่ → หนึ่ง session ต่อ thread
+    sess = getattr(_tls, "session", None)
+    if sess is None:
+        sess = _tls.session = requests.Session()
+    return sess
+
+def _get_page(params: dict) -> list:
+    with _HTTP_SLOTS:
+        for attempt in range(5):
+            try:
+                _BUCKET.wait()
+                resp = _session().get(BINANCE_KLINES_URL, params=params, timeout=20)
+                if resp.status_code == 429:
+                    if attempt == 4:
+                        resp.raise_for_status()
+                    time.sleep(2 ** attempt)
+                    continue
+                resp.raise_for_status()
+                data = resp.json()
+                break
+            except Exception:
+                if attempt == 4:
+                    raise
+                time.sleep(1.5 * (attempt + 1))
+    # แปลงเป็น Arrow ใน worker เลย → หน้าที่เสร็จก่อนลำดับถือไว้แบบคอลัมน์ ไม่ใช่ list ของ list
+    return _page_to_batch(data) if data else None
+
+def _fetch_klines(symbol: str, interval: str, start: datetime, end: datetime, sink: str, limit: int = 1000) -> int:
+    """
+    ดึง klines ทั้งช่วงแล้วเขียนต่อท้ายไฟล์ Arrow IPC (sink) ทีละหน้า → หน่วยความจำคงที่ระดับหน้า ไม่โตตามช่วงเวลา
+    คืนจำนวนแถวที่เขียน
+    """
     start_ms = _ms(start)
     end_ms   = _ms(end)
 
@@ -56,79 +140,84 @@ def _fetch_klines(symbol: str, interval: str, start: datetime, end: datetime, li
     }
     step_ms = step_map[interval] * (limit - 1)
 
-    current = start_ms
-    session = requests.Session()
-
-    while current < end_ms:
-        params = {
+    # คำนวณทุกหน้าไว้ก่อน (แต่ละหน้า ≤ limit แท่ง ไม่ซ้อนกัน) แล้วกระจายให้ thread pool
+    windows = [
+        {
             "symbol": symbol,
             "interval": interval,
             "startTime": current,
             "endTime": min(current + step_ms, end_ms),
             "limit": limit,
         }
-
-        for attempt in range(5):
-            try:
-                resp = session.get(BINANCE_KLINES_URL, params=params, timeout=20)
-                if resp.status_code == 429:
-                    time.sleep(2 ** attempt)
-                    continue
-                resp.raise_for_status()
-                data = resp.json()
-                break
-            except Exception:
-                if attempt == 4:
-                    raise
-                time.sleep(1.5 * (attempt + 1))
-
-        if not data:
-            current = params["endTime"] + step_map[interval]
-            continue
-
-        out.extend(data)
-        last_open_time = data[-1][0]
-        current = last_open_time + step_map[interval]
-        time.sleep(0.05)
-
-    return out
-
-def _to_df(klines: list) -> pd.DataFrame:
-    if not klines:
-        return pd.DataFrame(columns=["timestamp","open","high","low","close","volume"])
-
-    df = pd.DataFrame(klines, columns=[
-        "open_time", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades", "taker_base", "taker_quote", "ignore"
-    ])
-
-    for col in ["open","high","low","close","volume"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    df["timestamp"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    df = df[["timestamp","open","high","low","close","volume"]].sort_values("timestamp").reset_index(drop=True)
-
-    return df
+        for current in range(start_ms, end_ms, step_ms + step_map[interval])
+    ]
+
+    rows = 0
+    with ThreadPoolExecutor(max_workers=KLINE_WORKERS) as ex, pa.ipc.new_file(sink, _KLINE_SCHEMA) as writer:
+        for batch in ex.map(_get_page, windows):
+            if batch is not None:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
+
+def _to_df(path: str) -> pd.DataFrame:
+    # memory_map → Arrow อ่าน buffer จากไฟล์ตรงๆ ไม่ copy เข้าหน่วยความจำก่อนแปลงเป็น pandas
+    with pa.memory_map(path) as src:
+        table = pa.ipc.open_file(src).read_all().sort_by("timestamp")
+        return table.to_pandas()
+
+def write_sheets_xlsx(path: str, frames: dict[str, pd.DataFrame]) -> None:
+    """
+    เขียนหลายชีทลง xlsx ไฟล์เดียว
+    - มี xlsxwriter → constant_memory: เขียนทีละแถวแล้ว flush ลงดิสก์ (ไม่ค้างทั้ง workbook ในหน่วยความจำ)
+      ต้องเขียนเองทีละแถว เพราะ df.to_excel เขียนทีละคอลัมน์ → โหมดนี้จะทิ้งคอลัมน์ก่อนหน้า
+    - ไม่มี → pd.ExcelWriter(openpyxl) แบบเดิม
+    """
+    if xlsxwriter is None:
+        with pd.ExcelWriter(path, engine="openpyxl", mode="w") as xw:
+            for sheet, df in frames.items():
+                df.to_excel(xw, sheet_name=sheet, index=False)
+        return
+
+    wb = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "strings_to_numbers": False,
+        "remove_timezone": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    try:
+        for sheet, df in frames.items():
+            ws = wb.add_worksheet(sheet)
+            ws.write_row(0, 0, [str(c) for c in df.columns])
+            for i, row in enumerate(df.itertuples(index=False, name=None), start=1):
+                ws.write_row(i, 0, row)
+    finally:
+        wb.close()
 
 def fetch_interval(interval_label: str) -> pd.DataFrame:
     interval = INTERVALS[interval_label]
-    klines = _fetch_klines(SYMBOL, interval, START_AT, END_AT, limit=1000)
-    return _to_df(klines)
+    with tempfile.TemporaryDirectory(prefix="klines_") as tmp:
+        sink = os.path.join(tmp, f"{SYMBOL}_{interval}.arrow")
+        _fetch_klines(SYMBOL, interval, START_AT, END_AT, sink, limit=1000)
+        return _to_df(sink)
 
 def main():
     os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
 
-    data_frames = {}
-    for lbl in ["1D", "4H", "1H", "30M", "15M", "5M"]:
-        print(f"Downloading BTCUSDT {lbl} ...")
-        df = fetch_interval(lbl)
-        print(f"→ {len(df)} rows")
-        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True).dt.strftime("%Y-%m-%d %H:%M:%S")
-        data_frames[lbl] = df
-
-    with pd.ExcelWriter(OUT_PATH, engine="openpyxl", mode="w") as xw:
-        for lbl, df in data_frames.items():
-            df.to_excel(xw, sheet_name=f"BTCUSDT_{lbl}", index=False)
+    labels = ["1D", "4H", "1H", "30M", "15M", "5M"]
+    # แต่ละ interval รอ network เป็นหลัก → ดาวน์โหลดพร้อมกัน (requests ปล่อย GIL ระหว่างรอ I/O)
+    with ThreadPoolExecutor(max_workers=len(labels)) as ex:
+        futures = {lbl: ex.submit(fetch_interval, lbl) for lbl in labels}
+        data_frames = {}
+        for lbl, fut in futures.items():
+            print(f"Downloading BTCUSDT {lbl} ...")
+            df = fut.result()
+            print(f"→ {len(df)} rows")
+            # เขียนเป็น datetime ตรงๆ (Excel แสดงเป็นวันที่เอง) ไม่ต้อง strftime ทีละแถว; ตัด tz → เวลา UTC แบบ naive
+            df["timestamp"] = df["timestamp"].dt.tz_convert(None)
+            data_frames[lbl] = df
+
+    write_sheets_xlsx(OUT_PATH, {f"BTCUSDT_{lbl}": df for lbl, df in data_frames.items()})
 
     print(f"Saved → {OUT_PATH}")
 
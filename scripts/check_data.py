@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 
+from app.analysis.timeframes import read_excel_cached
+
 FILE_PATH = "app/data/historical.xlsx"
 
 def check_data(file_path=FILE_PATH, start=None, end=None):
@@ -8,13 +10,17 @@ def check_data(file_path=FILE_PATH, start=None, end=None):
         print(f"❌ ไม่พบไฟล์ {file_path}")
         return
 
-    df = pd.read_excel(file_path)
+    df = read_excel_cached(file_path)  # ครั้งถัดไปอ่านจาก Parquet cache
     print(f"✅ พบไฟล์ {file_path}")
     print("คอลัมน์:", df.columns.tolist())
     print("จำนวนแถวทั้งหมด:", len(df))
 
     if start and end:
-        subset = df[(df["timestamp"] >= start) & (df["timestamp"] <= end)]
+        # ใช้ timestamp เป็น DatetimeIndex ที่เรียงแล้ว → .loc[start:end] หาขอบด้วย binary search (ไม่สร้าง boolean mask)
+        df = df.set_index(pd.DatetimeIndex(pd.to_datetime(df["timestamp"])))
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind="stable")
+        subset = df.loc[pd.Timestamp(start):pd.Timestamp(end)]
         print(f"\nช่วง {start} → {end}")
         print("จำนวนข้อมูล:", len(subset))
         if not subset.empty:
@@ -1,28 +1,40 @@
 #!/usr/bin/env python3
 # ดึงแท่งเทียน BTCUSDT 1D (ล่าสุด 500 แท่ง) จาก Binance public API
-import sys, json, datetime as dt, urllib.request
+import sys, json, urllib.request
+import numpy as np
+
+try:
+    import orjson  # parse JSON ใน C (เร็วกว่า json มาตรฐานกับ array ตัวเลข)
+except Exception:
+    orjson = None
+
+try:
+    import httpx
+except Exception:
+    httpx = None
 
 symbol = "BTCUSDT"
 interval = "1d"
 limit = 500
 url = f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}"
 
-with urllib.request.urlopen(url, timeout=15) as resp:
-    data = json.loads(resp.read().decode())
+if httpx is not None:
+    raw = httpx.get(url, timeout=15).raise_for_status().content
+else:
+    with urllib.request.urlopen(url, timeout=15) as resp:
+        raw = resp.read()
+data = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
 # รูปแบบ klines: [openTime, open, high, low, close, volume, closeTime, ...]
-def ts(ms): return dt.datetime.utcfromtimestamp(ms/1000).strftime("%Y-%m-%d")
-
-rows = [{
-    "date": ts(x[0]),
-    "open": float(x[1]),
-    "high": float(x[2]),
-    "low":  float(x[3]),
-    "close":float(x[4]),
-    "volume":float(x[5]),
-} for x in data]
+# แปลงเป็นคอลัมน์ numpy ครั้งเดียว แทนสร้าง dict ทีละแท่ง
+arr = np.array(data, dtype=object).reshape(-1, 12)
+dates = arr[:, 0].astype(np.int64).astype("datetime64[ms]").astype("datetime64[D]").astype(str)
+cols = {
+    name: arr[:, i].astype(np.float64)
+    for i, name in enumerate(["open", "high", "low", "close", "volume"], start=1)
+}
 
-print(f"Fetched: {len(rows)} candles for {symbol} ({interval})")
+print(f"Fetched: {len(dates)} candles for {symbol} ({interval})")
 print("Last 3 rows:")
-for r in rows[-3:]:
-    print(r)
+for i in range(max(0, len(dates) - 3), len(dates)):
+    print({"date": str(dates[i]), **{name: float(col[i]) for name, col in cols.items()}})
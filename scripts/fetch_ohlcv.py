@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
-import os, time, sys
+import os, sys, time
+import asyncio
 from datetime import datetime, timedelta, timezone
 import argparse
-import ccxt
+import ccxt.async_support as ccxt
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv  # writer C++ (เร็วกว่า df.to_csv มากกับไฟล์ใหญ่)
+except Exception:
+    pa = pacsv = None
+
 # ----------------------------
 # แปลงรูปแบบ TF ที่ผู้ใช้กรอก -> รูปแบบ ccxt/binance
 # ----------------------------
@@ -50,37 +57,91 @@ def tf_ms(tf_ccxt: str) -> int:
 # ----------------------------
 # ดึงแบบต่อเนื่องด้วย since (paginate)
 # ----------------------------
-def fetch_all_ohlcv(exchange, symbol: str, timeframe_ccxt: str, since_ms: int, until_ms: int, max_limit: int = 1000):
-    all_rows = []
-    cursor = since_ms
-    step_ms = tf_ms(timeframe_ccxt)
+# Binance spot klines ได้สูงสุด 1000 แท่ง/หน้า
+_MAX_PAGE = 1000
+# Asia/Bangkok = UTC+7 คงที่ (ไม่มี DST) → บวก offset เป็น ms ตรงๆ แทน tz_convert/tz_localize
+_BKK_OFFSET_MS = 7 * 3600 * 1000
 
-    while True:
-        try:
-            batch = exchange.fetch_ohlcv(symbol, timeframe=timeframe_ccxt, since=cursor, limit=max_limit)
-        except Exception as e:
-            print(f"[{timeframe_ccxt}] fetch error at {datetime.fromtimestamp(cursor/1000, tz=timezone.utc)} -> {e}", file=sys.stderr)
-            time.sleep(1.5)
-            continue
+# klines ใช้ weight 2 จากโควตา 1200/นาที → เฉลี่ยได้ ~10 req/s; ยิงรวดได้ไม่เกิน capacity
+OHLCV_RPS = float(os.getenv("OHLCV_RPS", "8"))
+OHLCV_BURST = int(os.getenv("OHLCV_BURST", "10"))
+
+class AsyncTokenBucket:
+    """
+    token bucket สำหรับ asyncio: ยิงรวดได้ capacity ครั้ง แล้วเติม rate token/วินาที
+    ใช้แทน throttler ของ ccxt (ซึ่งเว้นทุก request เท่ากันตาม rateLimit ไม่ยอมให้ burst)
+    """
 
-        if not batch:
-            break
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
 
-        all_rows.extend(batch)
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return self
+                await asyncio.sleep((1 - self._tokens) / self.rate)
 
-        last_ts = batch[-1][0]
-        # ขยับ cursor ไปแท่งถัดไป
-        next_cursor = last_ts + step_ms
-        if next_cursor <= cursor:
-            break
-        cursor = next_cursor
+    async def __aexit__(self, *exc):
+        return False
 
-        # หยุดถ้าเลยเป้าหมาย หรือท้ายช่วง (จำนวน < limit)
-        if last_ts >= until_ms or len(batch) < max_limit:
-            break
+    def slow_down(self) -> None:
+        """โดน 418/429 → ลดอัตราลงครึ่งหนึ่ง และทิ้ง token ที่สะสมไว้"""
+        self.rate = max(self.rate / 2, 0.5)
+        self._tokens = 0.0
+
+def _retry_after(exchange, default: float) -> float:
+    headers = getattr(exchange, "last_response_headers", None) or {}
+    try:
+        return float(headers.get("Retry-After") or headers.get("retry-after") or default)
+    except (TypeError, ValueError):
+        return default
+
+async def _fetch_page(exchange, limiter: AsyncTokenBucket, symbol: str, timeframe_ccxt: str, since: int, limit: int, attempts: int = 5) -> list:
+    """
+    ดึงหนึ่งหน้า (ผ่าน limiter)
+    - DDoSProtection (418/429) → ลดอัตรา limiter ครึ่งหนึ่ง แล้วรอตาม Retry-After
+    - NetworkError อื่น → backoff แบบ exponential ด้วย asyncio.sleep
+    """
+    for attempt in range(attempts):
+        try:
+            async with limiter:
+                return await exchange.fetch_ohlcv(symbol, timeframe=timeframe_ccxt, since=since, limit=limit)
+        except ccxt.NetworkError as e:
+            if attempt == attempts - 1:
+                raise
+            print(f"[{timeframe_ccxt}] fetch error at {datetime.fromtimestamp(since/1000, tz=timezone.utc)} -> {e}", file=sys.stderr)
+            delay = 1.5 * 2 ** attempt
+            if isinstance(e, ccxt.DDoSProtection):
+                limiter.slow_down()
+                delay = _retry_after(exchange, delay)
+            await asyncio.sleep(delay)
+    return []
 
-        # เคารพ rate limit
-        time.sleep(max(getattr(exchange, "rateLimit", 200) / 1000.0, 0.2))
+async def fetch_all_ohlcv(exchange, symbol: str, timeframe_ccxt: str, since_ms: int, until_ms: int, max_limit: int = 1000,
+                          limiter: AsyncTokenBucket | None = None):
+    """
+    แบ่งช่วง [since, until] เป็นหน้าไม่ซ้อนกัน (หน้าละ max_limit แท่ง) แล้วยิงพร้อมกันด้วย asyncio.gather
+    จังหวะการยิงให้ limiter (token bucket ใช้ร่วมทุก TF) คุม แทน sleep ระหว่างหน้า
+    """
+    if limiter is None:
+        limiter = AsyncTokenBucket(OHLCV_RPS, OHLCV_BURST)
+    max_limit = min(int(max_limit), _MAX_PAGE)
+    span_ms = tf_ms(timeframe_ccxt) * max_limit
+
+    batches = await asyncio.gather(*(
+        _fetch_page(exchange, limiter, symbol, timeframe_ccxt, since, max_limit)
+        for since in range(since_ms, until_ms + 1, span_ms)
+    ))
+    all_rows = [row for batch in batches for row in batch]
 
     if not all_rows:
         return pd.DataFrame(columns=["timestamp","open","high","low","close","volume"])
@@ -88,50 +149,140 @@ def fetch_all_ohlcv(exchange, symbol: str, timeframe_ccxt: str, since_ms: int, u
     df = pd.DataFrame(all_rows, columns=["timestamp","open","high","low","close","volume"])
     df = df.drop_duplicates(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
 
-    # แปลง timestamp เป็น Asia/Bangkok แล้วถอด tz ออก (ให้เข้ากับไฟล์เดิม)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True).dt.tz_convert("Asia/Bangkok").dt.tz_localize(None)
+    # แปลง timestamp เป็นเวลา Asia/Bangkok แบบไม่มี tz (ให้เข้ากับไฟล์เดิม)
+    df["timestamp"] = pd.to_datetime(df["timestamp"].to_numpy(dtype="int64") + _BKK_OFFSET_MS, unit="ms")
     return df
 
+def _write_csv(df: pd.DataFrame, path: str, append: bool = False) -> None:
+    """
+    เขียน CSV ด้วย pyarrow ถ้ามี (timestamp เป็นวินาที → ไม่มีเศษ .000000000 ท้ายค่า); ไม่มี → df.to_csv
+    append=True → ต่อท้ายไฟล์เดิมโดยไม่เขียน header
+    header เขียนเองแบบไม่มี quote (writer ของ pyarrow ใส่ "..." ครอบชื่อคอลัมน์เสมอ) ให้ตรงกับไฟล์จาก df.to_csv
+    """
+    if pacsv is None:
+        df.to_csv(path, mode="a" if append else "w", header=not append, index=False)
+        return
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table[field.name].cast(pa.timestamp("s"), safe=False))
+    opts = pacsv.WriteOptions(include_header=False, quoting_style="needed")
+    with open(path, "ab" if append else "wb") as fh:
+        if not append:
+            fh.write((",".join(table.column_names) + "\n").encode())
+        pacsv.write_csv(table, fh, write_options=opts)
+
+def _rewrite_merged_csv(df: pd.DataFrame, out_path: str) -> None:
+    """รวมไฟล์เดิมทั้งไฟล์กับข้อมูลใหม่ แล้วเขียนทับ (ใช้เฉพาะกรณี append ต่อท้ายไม่ได้)"""
+    old = pd.read_csv(out_path)
+    # ปกป้อง schema: ensure columns เดิมครบ
+    want_cols = ["timestamp","open","high","low","close","volume"]
+    for c in want_cols:
+        if c not in df.columns:
+            df[c] = pd.NA
+    for c in want_cols:
+        if c not in old.columns:
+            old[c] = pd.NA
+    # แปลง timestamp เป็น datetime (naive)
+    old["timestamp"] = pd.to_datetime(old["timestamp"], errors="coerce")
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    merged = pd.concat([old[want_cols], df[want_cols]], ignore_index=True)
+    merged = merged.dropna(subset=["timestamp"]).drop_duplicates(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
+    _write_csv(merged, out_path)
+
+def _csv_bounds(path: str):
+    """
+    อ่านแค่ header + แถวแรก + แถวสุดท้ายของ CSV (seek ไปท้ายไฟล์ ไม่ parse ทั้งไฟล์)
+    คืน (ชื่อคอลัมน์, timestamp แรก, timestamp สุดท้าย) หรือ None ถ้าไม่มีแถวข้อมูล/อ่านไม่ได้
+    """
+    with open(path, "rb") as fh:
+        header = fh.readline().decode().strip()
+        first = fh.readline().decode().strip()
+        fh.seek(0, os.SEEK_END)
+        size = fh.tell()
+        fh.seek(max(0, size - 4096))
+        tail = fh.read().splitlines()
+    if not first or not tail:
+        return None
+    cols = [c.strip('"') for c in header.split(",")]
+    try:
+        first_ts = pd.Timestamp(first.split(",", 1)[0].strip('"'))
+        last_ts = pd.Timestamp(tail[-1].decode().split(",", 1)[0].strip('"'))
+    except ValueError:
+        return None
+    return cols, first_ts, last_ts
+
 def save_merge_csv(df: pd.DataFrame, out_path: str) -> None:
+    """
+    ต่อท้ายเฉพาะแถวที่ใหม่กว่าแถวสุดท้ายในไฟล์ (append-only, ไม่อ่าน/เรียง/เขียนทับทั้งไฟล์ทุกรอบ)
+    เขียนทับแบบรวมทั้งไฟล์เฉพาะเมื่อ schema ไม่ตรง หรือมีข้อมูลเก่ากว่าแถวแรก (backfill ย้อนหลัง)
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    want_cols = ["timestamp","open","high","low","close","volume"]
+    if not os.path.exists(out_path):
+        _write_csv(df, out_path)
+        return
+
+    bounds = _csv_bounds(out_path)
+    ts = pd.to_datetime(df["timestamp"], errors="coerce") if "timestamp" in df.columns else None
+    if (
+        bounds is None
+        or ts is None
+        or bounds[0] != want_cols
+        or not set(want_cols).issubset(df.columns)
+        or (ts < bounds[1]).any()
+    ):
+        _rewrite_merged_csv(df, out_path)
+        return
+
+    new = df.loc[ts > bounds[2], want_cols].drop_duplicates(subset=["timestamp"], keep="last").sort_values("timestamp")
+    if len(new):
+        _write_csv(new, out_path, append=True)
+
+def _bkk_to_epoch_ms(ts: pd.Series):
+    """เวลากรุงเทพแบบ naive → epoch ms (UTC) เป็น int64"""
+    return pd.to_datetime(ts).to_numpy(dtype="datetime64[ms]").astype("int64") - _BKK_OFFSET_MS
+
+def save_merge_parquet(df: pd.DataFrame, out_path: str) -> None:
+    """
+    Parquet (zstd) ข้างไฟล์ CSV ชื่อเดียวกัน → get_data ใช้ไฟล์นี้ก่อน CSV (ถ้าไม่เก่ากว่า)
+    timestamp เก็บเป็น epoch ms (UTC, int64) แบบเดียวกับ cache ของ jobs/push_btc_hourly
+    (_parse_and_clean_strict ตีความ epoch เป็น UTC; datetime แบบ naive จะถูกอ่านเป็น UTC ผิดไป 7 ชม.)
+    """
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    want_cols = ["timestamp","open","high","low","close","volume"]
+    new = df.reindex(columns=want_cols).assign(timestamp=pd.to_datetime(df["timestamp"], errors="coerce"))
+    new = new.dropna(subset=["timestamp"])
+    new["timestamp"] = _bkk_to_epoch_ms(new["timestamp"])
     if os.path.exists(out_path):
-        old = pd.read_csv(out_path)
-        # ปกป้อง schema: ensure columns เดิมครบ
-        want_cols = ["timestamp","open","high","low","close","volume"]
-        for c in want_cols:
-            if c not in df.columns:
-                df[c] = pd.NA
-        for c in want_cols:
-            if c not in old.columns:
-                old[c] = pd.NA
-        # แปลง timestamp เป็น datetime (naive)
-        old["timestamp"] = pd.to_datetime(old["timestamp"], errors="coerce")
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-        merged = pd.concat([old[want_cols], df[want_cols]], ignore_index=True)
-        merged = merged.dropna(subset=["timestamp"]).drop_duplicates(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
-        merged.to_csv(out_path, index=False)
-    else:
-        df.to_csv(out_path, index=False)
+        old = pd.read_parquet(out_path, engine="pyarrow", columns=want_cols)
+        if pd.api.types.is_datetime64_any_dtype(old["timestamp"]):  # ไฟล์รุ่นก่อน (datetime กรุงเทพแบบ naive)
+            old["timestamp"] = _bkk_to_epoch_ms(old["timestamp"])
+        new = pd.concat([old, new], ignore_index=True)
+    merged = new.drop_duplicates(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+    merged = merged.astype({"timestamp": "int64", "open": "float64", "high": "float64",
+                            "low": "float64", "close": "float64", "volume": "float64"})
+    merged.to_parquet(out_path, engine="pyarrow", compression="zstd", index=False)
 
 def parse_args():
     p = argparse.ArgumentParser(description="Fetch OHLCV from Binance via CCXT")
     p.add_argument("symbol", help="เช่น BTCUSDT หรือ BTC/USDT")
-    p.add_argument("timeframe", help="หนึ่งค่า: 5M, 15M, 30M, 1H, 4H, 1D, 1W")
+    p.add_argument("timeframe", nargs="+", help="หนึ่งค่าหรือหลายค่า (ดึงพร้อมกัน): 5M, 15M, 30M, 1H, 4H, 1D, 1W")
     p.add_argument("--start", help='วันเริ่ม (YYYY-MM-DD). ตัวอย่าง: "2024-01-01"', default=None)
     p.add_argument("--end", help='วันสิ้นสุด (YYYY-MM-DD). ไม่ใส่ = ตอนนี้', default=None)
     p.add_argument("--days", type=int, help="ระบุจำนวนวันย้อนหลังแทน --start/--end", default=None)
     p.add_argument("--limit", type=int, help="ccxt limit ต่อครั้ง (default=1000)", default=1000)
+    p.add_argument("--no-csv", dest="csv", action="store_false",
+                   help="ไม่เขียน CSV (default เขียนทั้ง .csv และ .parquet; app/analysis/mtf_prep อ่าน CSV)")
     return p.parse_args()
 
-def main():
-    args = parse_args()
-
+async def _run(args) -> None:
     symbol_pair = _to_pair(args.symbol)
-    tf_ccxt = _norm_tf(args.timeframe)
+    tfs_ccxt = [_norm_tf(tf) for tf in args.timeframe]
     max_limit = int(args.limit or 1000)
 
-    # เปิด rate limit ในตัว
-    exchange = ccxt.binance({"enableRateLimit": True})
+    # คุมอัตราเองด้วย token bucket (ปิด throttler ในตัวของ ccxt ไม่ให้หน่วงซ้อน)
+    exchange = ccxt.binance({"enableRateLimit": False})
 
     # สร้างช่วงเวลา
     now_ms = exchange.milliseconds()
@@ -156,21 +307,36 @@ def main():
         else:
             until_ms = now_ms
 
-    # ดึงข้อมูล
-    print(f"== Fetch {symbol_pair} {tf_ccxt} ==")
-    df = fetch_all_ohlcv(exchange, symbol_pair, tf_ccxt, since_ms, until_ms, max_limit=max_limit)
+    # ดึงข้อมูล: ทุก TF พร้อมกัน (แต่ละ TF อิสระต่อกัน)
+    print(f"== Fetch {symbol_pair} {' '.join(tfs_ccxt)} ==")
+    limiter = AsyncTokenBucket(OHLCV_RPS, OHLCV_BURST)
+    try:
+        dfs = await asyncio.gather(*(
+            fetch_all_ohlcv(exchange, symbol_pair, tf_ccxt, since_ms, until_ms, max_limit=max_limit, limiter=limiter)
+            for tf_ccxt in tfs_ccxt
+        ))
+    finally:
+        await exchange.close()
 
-    # ตั้งชื่อไฟล์แบบชุดเดิม (BTCUSDT_5M.csv ฯลฯ)
     sym_noslash = args.symbol.replace("/", "").replace(":", "").replace("-", "")
-    tf_key = [k for k, v in _BINANCE_INTERVAL.items() if v == tf_ccxt][0]
-    out = f"data/{sym_noslash}_{tf_key}.csv"
+    for tf_ccxt, df in zip(tfs_ccxt, dfs):
+        # ตั้งชื่อไฟล์แบบชุดเดิม (BTCUSDT_5M.parquet / .csv ฯลฯ)
+        tf_key = [k for k, v in _BINANCE_INTERVAL.items() if v == tf_ccxt][0]
+        base = f"data/{sym_noslash}_{tf_key}"
 
-    save_merge_csv(df, out)
+        # CSV ก่อน → Parquet ใหม่กว่าเสมอ (get_data ข้าม Parquet ที่เก่ากว่า CSV)
+        if args.csv:
+            save_merge_csv(df, base + ".csv")
+        out = base + ".parquet"
+        save_merge_parquet(df, out)
 
-    if len(df):
-        print(f"✅ merged -> {out} (+{len(df)} rows fetched)  from={df['timestamp'].min()}  to={df['timestamp'].max()}")
-    else:
-        print(f"⚠️  no new data fetched for {tf_key}")
+        if len(df):
+            print(f"✅ merged -> {out} (+{len(df)} rows fetched)  from={df['timestamp'].min()}  to={df['timestamp'].max()}")
+        else:
+            print(f"⚠️  no new data fetched for {tf_key}")
+
+def main():
+    asyncio.run(_run(parse_args()))
 
 if __name__ == "__main__":
     main()
@@ -41,10 +41,15 @@ def mock_prices_toward(target: float, start: Optional[float] = None, steps: int
     """
     สร้างลิสต์ราคาไล่เข้าใกล้ target แบบง่าย ๆ
     """
+    if steps <= 0:
+        raise ValueError(f"steps ต้องมากกว่า 0 (ได้ {steps})")
     if start is None:
         # ถ้าไม่ได้ระบุ start ให้เริ่มห่างสัก 1.5% ลง/ขึ้นแบบสุ่มเล็กน้อย
         start = target * (0.985 if target > 0 else 1.0)
-    step = (target - start) / max(steps, 1)
+    if start == target:
+        # เริ่มที่ target อยู่แล้ว → tick เดียวพอ
+        return [target]
+    step = (target - start) / steps
     return [start + i * step for i in range(steps)] + [target, target + step]
 
 def fmt(x: Optional[float]) -> str:
@@ -1,15 +1,21 @@
 # scripts/mta_alert_bot.py
 # แจ้งเตือน MTA: 1D→4H→1H  (Breakout / Pullback Zone / ใกล้เงื่อนไข)
 from __future__ import annotations
+import json
 import os
+from functools import lru_cache
+from pathlib import Path
 from typing import Optional, Tuple
 
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
 load_dotenv()  # โหลด .env (ต้องมี LINE_CHANNEL_ACCESS_TOKEN, LINE_USER_ID, PYTHONPATH=.)
 
 from app.analysis.timeframes import get_data
 from app.logic.scenarios import analyze_scenarios   # ✅ แก้ import มาที่ logic
 from app.analysis.indicators import apply_indicators
+from jobs._common import CACHE_DIR, _bar_open
 
 # ====== CONFIG ======
 SYMBOLS = os.getenv("MTA_SYMBOLS", "BTCUSDT").split(",")
@@ -20,11 +26,17 @@ ZONE_TOL  = float(os.getenv("MTA_ZONE_TOL",  "0.0010"))   # 0.10%
 LINE_TOKEN = os.getenv("LINE_CHANNEL_ACCESS_TOKEN")  # ต้องมี
 LINE_TO    = os.getenv("LINE_USER_ID")               # ต้องมี
 
+# แท่ง 1H ล่าสุดที่ประมวลผลแล้วต่อ symbol (cron ถี่กว่า 1H → ข้ามรอบที่ยังไม่มีแท่งใหม่)
+STATE_PATH = Path(os.getenv("MTA_STATE_PATH", os.path.join(CACHE_DIR, "mta_state.json")))
+
 def _fmt(x: Optional[float]) -> str:
     return "-" if x is None else f"{x:,.2f}"
 
-def _send_line(text: str):
-    """ส่ง Push เข้า LINE ถ้า token และ user id พร้อม; ไม่งั้น print"""
+def _send_line(text: str) -> bool:
+    """
+    ส่ง Push เข้า LINE ถ้า token และ user id พร้อม; ไม่งั้น print
+    คืน False เฉพาะกรณีตั้งค่า LINE ไว้แต่ส่งไม่สำเร็จ (ยังไม่ถือว่าแจ้งแท่งนี้แล้ว)
+    """
     if LINE_TOKEN and LINE_TO:
         try:
             from linebot.v3.messaging import Configuration, ApiClient, MessagingApi, PushMessageRequest, TextMessage
@@ -34,10 +46,44 @@ def _send_line(text: str):
                     PushMessageRequest(to=LINE_TO, messages=[TextMessage(text=text[:4900])])
                 )
             print("✅ [LINE] sent")
-            return
+            return True
         except Exception as e:
             print(f"[LINE ERROR] {e} -> fallback print")
+            print(text)
+            return False
     print(text)
+    return True
+
+@lru_cache(maxsize=64)
+def _load(symbol: str, tf: str, bar: int):
+    """
+    memo ของ get_data ระดับโมดูล: key มีเวลาเปิดแท่งปัจจุบันของ TF (_bar_open)
+    → ขึ้นแท่งใหม่เมื่อไหร่ key เปลี่ยน โหลดใหม่เอง; ผลใช้ร่วมกัน → ห้ามแก้ไข in-place
+    """
+    return get_data(symbol, tf)
+
+@lru_cache(maxsize=64)
+def _scenarios(symbol: str, tf: str, bar: int) -> dict:
+    """memo ของ analyze_scenarios ด้วย key เดียวกับ _load"""
+    return analyze_scenarios(_load(symbol, tf, bar), symbol=symbol, tf=tf)
+
+def _read_state() -> dict:
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def _write_state(symbol: str, last_ts: int) -> None:
+    """บันทึก last_ts ของ symbol (atomic ผ่าน os.replace)"""
+    state = _read_state()
+    state[symbol] = last_ts
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, STATE_PATH)
 
 def _brief(msg: str) -> str:
     return f"• {msg}"
@@ -56,25 +102,30 @@ def _fib_zone(levels_fibo: dict, bias: str) -> Optional[Tuple[float, float]]:
     return (float(lo), float(hi))
 
 def run_symbol(symbol: str):
+    # 0) แท่ง 1H ล่าสุดยังเป็นแท่งเดิม → ไม่มีอะไรใหม่ให้แจ้ง ข้ามทั้งหมด
+    df_1h = _load(symbol, "1H", _bar_open("1H"))
+    last_ts = int(pd.Timestamp(df_1h["timestamp"].iloc[-1]).value)
+    if _read_state().get(symbol) == last_ts:
+        print(f"[MTA] {symbol}: no new 1H bar → skip")
+        return
+
     # 1) 1D → bias
-    df_1d = get_data(symbol, "1D")
-    sc_1d = analyze_scenarios(df_1d, symbol=symbol, tf="1D")
+    sc_1d = _scenarios(symbol, "1D", _bar_open("1D"))
     bias = _pick_bias(sc_1d["percent"])
 
     # 2) 4H → zone/invalidate
-    df_4h = get_data(symbol, "4H")
-    sc_4h = analyze_scenarios(df_4h, symbol=symbol, tf="4H")
+    sc_4h = _scenarios(symbol, "4H", _bar_open("4H"))
     fibo = (sc_4h["levels"] or {}).get("fibo", {}) or {}
     zone = _fib_zone(fibo, bias)
     invalidate = (sc_4h["levels"] or {}).get("recent_low") if bias == "up" else (sc_4h["levels"] or {}).get("recent_high")
 
     # 3) 1H → trigger context
-    df_1h = get_data(symbol, "1H")
     df_1h_ind = apply_indicators(df_1h)
     last = df_1h_ind.iloc[-1]
     close = float(last["close"]); rsi = float(last["rsi14"]); macd_hist = float(last["macd_hist"])
-    recent_high_1h = float(df_1h["high"].tail(20).max())
-    recent_low_1h  = float(df_1h["low"].tail(20).min())
+    # swing 20 แท่งล่าสุดจาก numpy view ตรงๆ (ไม่ copy Series ผ่าน tail); nan* = ข้าม NaN แบบ pandas
+    recent_high_1h = float(np.nanmax(df_1h["high"].to_numpy()[-20:]))
+    recent_low_1h  = float(np.nanmin(df_1h["low"].to_numpy()[-20:]))
 
     broke_high = close >= recent_high_1h * (1 - BREAK_TOL)
     broke_low  = close <= recent_low_1h  * (1 + BREAK_TOL)
@@ -132,7 +183,9 @@ def run_symbol(symbol: str):
         if abs(close - recent_low_1h) / max(recent_low_1h, 1) < ZONE_TOL:
             lines.append("⚠️ ใกล้ขอบล่างกรอบ (พิจารณา Rebound)")
 
-    _send_line("\n".join(lines))
+    # บันทึกแท่งนี้ว่าแจ้งแล้วเฉพาะเมื่อส่งสำเร็จ (ส่งล้ม → รอบถัดไปลองใหม่กับแท่งเดิม)
+    if _send_line("\n".join(lines)):
+        _write_state(symbol, last_ts)
 
 def main():
     for sym in SYMBOLS:
@@ -1,14 +1,22 @@
 # scripts/plot_chart.py
 
 import sys, os
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use("Agg")  # สคริปต์ headless บันทึกเป็น PNG อย่างเดียว → ไม่ต้องโหลด GUI backend (Tk/Qt)
 import mplfinance as mpf
+import numpy as np
 import pandas as pd
 
+try:
+    import talib  # optional: C loop สำหรับ EMA
+except Exception:
+    talib = None
+
 # ให้ Python มองเห็นโฟลเดอร์ app/
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from app.analysis.timeframes import get_data
+from app.analysis.indicators import ema as _ema_pd
 
 # โหลดข้อมูล BTCUSDT 1D
 df = get_data("BTCUSDT", "1D")
@@ -20,6 +28,15 @@ df.set_index("timestamp", inplace=True)
 # จัด columns ให้ตรงตามรูปแบบที่ mplfinance ต้องการ
 df = df[["open", "high", "low", "close", "volume"]]
 
+# คำนวณ EMA จากข้อมูลทั้งหมด (mav ของ mplfinance เป็น SMA ไม่ใช่ EMA)
+close = df["close"].to_numpy(dtype=np.float64)
+if talib is not None:
+    ema20 = talib.EMA(close, timeperiod=20)
+    ema50 = talib.EMA(close, timeperiod=50)
+else:
+    ema20 = _ema_pd(df["close"], 20).to_numpy(dtype=np.float64)
+    ema50 = _ema_pd(df["close"], 50).to_numpy(dtype=np.float64)
+
 # path สำหรับ save รูป
 out_path = os.path.join("app", "reports", "charts", "btcusdt_1d.png")
 
@@ -27,7 +44,10 @@ out_path = os.path.join("app", "reports", "charts", "btcusdt_1d.png")
 mpf.plot(
     df.tail(100),  # แสดง 100 แท่งล่าสุด
     type="candle",
-    mav=(20, 50),
+    addplot=[
+        mpf.make_addplot(ema20[-100:], color="blue"),
+        mpf.make_addplot(ema50[-100:], color="orange"),
+    ],
     volume=True,
     title="BTCUSDT 1D - Candlestick with EMA20 & EMA50",
     style="yahoo",
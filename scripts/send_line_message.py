@@ -4,25 +4,49 @@ from __future__ import annotations
 import os
 import argparse
 import sys
+import time
+import uuid
 import httpx
 
-def push_text(user_id: str, text: str) -> None:
+RETRY_ATTEMPTS = 4
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def send(to: str, text: str) -> None:
+    """push ข้อความเดียวไปหา LINE userId; ล้ม → RuntimeError (ใช้เรียกแบบ in-process)"""
     token = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "")
     if not token:
-        print("ERROR: LINE_CHANNEL_ACCESS_TOKEN is missing", file=sys.stderr)
-        sys.exit(1)
+        raise RuntimeError("LINE_CHANNEL_ACCESS_TOKEN is missing")
 
     url = "https://api.line.me/v2/bot/message/push"
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    payload = {"to": user_id, "messages": [{"type": "text", "text": text[:5000]}]}
+    payload = {"to": to, "messages": [{"type": "text", "text": text[:5000]}]}
+
+    # retry-key เดียวกันทุกครั้ง → LINE ไม่ส่งซ้ำถ้ารอบก่อนหน้าเข้าไปแล้ว
+    headers["X-Line-Retry-Key"] = str(uuid.uuid4())
 
     with httpx.Client(timeout=10) as client:
-        r = client.post(url, headers=headers, json=payload)
-        try:
-            r.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            print(f"ERROR: LINE push failed: {e.response.text}", file=sys.stderr)
-            sys.exit(2)
+        for attempt in range(RETRY_ATTEMPTS):
+            last = attempt == RETRY_ATTEMPTS - 1
+            try:
+                r = client.post(url, headers=headers, json=payload)
+            except httpx.TransportError as e:
+                if last:
+                    raise RuntimeError(f"LINE push failed: {e}") from e
+            else:
+                if r.status_code not in RETRY_STATUS or last:
+                    try:
+                        r.raise_for_status()
+                    except httpx.HTTPStatusError as e:
+                        raise RuntimeError(f"LINE push failed: {e.response.text}") from e
+                    return
+            time.sleep(min(5.0, 0.5 * 2 ** attempt))
+
+def push_text(user_id: str, text: str) -> None:
+    try:
+        send(user_id, text)
+    except RuntimeError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1 if "missing" in str(e) else 2)
 
 def main():
     ap = argparse.ArgumentParser()
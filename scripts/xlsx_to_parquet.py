@@ -0,0 +1,72 @@
+# scripts/xlsx_to_parquet.py
+# แปลง app/data/historical.xlsx (ทุกชีท) → Parquet ครั้งเดียว 2 layout
+# - app/data/historical.parquet/sheet=<ชีท>/ : layout เดียวกับที่ jobs/daily_btc_analysis.py เขียน
+# - data/klines/symbol=<SYM>/tf=<TF>/year=<YYYY>/ : hive partition ให้ pyarrow.dataset กรองช่วงเวลาได้
+#   โดยอ่านเฉพาะไฟล์ที่เกี่ยว (partition pruning + row-group statistics)
+#
+# ใช้งาน:
+#   python -m scripts.xlsx_to_parquet
+#   python -m scripts.xlsx_to_parquet --src app/data/historical.xlsx --dst app/data/historical.parquet
+
+import argparse
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from jobs.daily_btc_analysis import save_df_to_parquet
+
+KLINES_ROOT = "data/klines"
+
+
+def write_klines_dataset(df: pd.DataFrame, symbol: str, tf: str, root: str = KLINES_ROOT) -> None:
+    """เขียน OHLCV ลง {root}/symbol=/tf=/year=/ (แทนที่เฉพาะ partition ที่เขียน)"""
+    ts = pd.to_datetime(df["timestamp"])
+    out = df.assign(timestamp=ts, symbol=symbol, tf=tf, year=ts.dt.year.astype("int32"))
+    ds.write_dataset(
+        pa.Table.from_pandas(out, preserve_index=False),
+        root,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("symbol", pa.string()), ("tf", pa.string()), ("year", pa.int32())]),
+            flavor="hive",
+        ),
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+
+
+def convert(
+    src: str = "app/data/historical.xlsx",
+    dst: str = "app/data/historical.parquet",
+    klines_root: str = KLINES_ROOT,
+) -> int:
+    if not os.path.exists(src):
+        print(f"❌ ไม่พบไฟล์ {src}")
+        return 1
+
+    sheets = pd.read_excel(src, sheet_name=None, engine="openpyxl")
+    for name, df in sheets.items():
+        if "timestamp" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+        save_df_to_parquet(df, dst, name)
+        print(f"✅ {name}: rows={len(df)} → {dst}/sheet={name}")
+        symbol, _, tf = name.rpartition("_")
+        if symbol and "timestamp" in df.columns:
+            write_klines_dataset(df, symbol, tf, klines_root)
+            print(f"   ↳ {klines_root}/symbol={symbol}/tf={tf}/")
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="แปลง historical.xlsx เป็น Parquet dataset")
+    ap.add_argument("--src", default="app/data/historical.xlsx")
+    ap.add_argument("--dst", default="app/data/historical.parquet")
+    ap.add_argument("--klines-root", default=KLINES_ROOT)
+    args = ap.parse_args(argv)
+    return convert(args.src, args.dst, args.klines_root)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,9 @@
 from dotenv import load_dotenv
 import os
-import requests
 import json
 
+from app.adapters.delivery_line import LineDelivery
+
 # โหลดค่าจาก .env
 load_dotenv(dotenv_path=".env")
 TOKEN = os.getenv("LINE_CHANNEL_ACCESS_TOKEN")
@@ -32,16 +33,6 @@ msg = (
     f"TP: {tp[0]:,.2f}/{tp[1]:,.2f}/{tp[2]:,.2f} | SL: {sl:,.2f}"
 )
 
-# ส่งไป LINE Messaging API
-url = "https://api.line.me/v2/bot/message/push"
-headers = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
-payload = {
-    "to": TO,
-    "messages": [{"type": "text", "text": msg}]
-}
-
-resp = requests.post(url, headers=headers, json=payload)
-print("Status:", resp.status_code, resp.text)
+# ส่งไป LINE Messaging API (LineDelivery มี retry + backoff สำหรับ 429/5xx ในตัว)
+resp = LineDelivery(TOKEN).push_text(TO, msg)
+print("Status:", resp["status"], resp["error"])
@@ -0,0 +1,59 @@
+# tests/analysis/test_timeframes_cache.py
+import os
+import time
+
+import pandas as pd
+
+from app.analysis.timeframes import read_excel_cached
+from jobs.daily_btc_analysis import save_df_to_parquet
+
+
+def _write_xlsx(path, n):
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10.0,
+    })
+    with pd.ExcelWriter(path) as w:
+        df.to_excel(w, sheet_name="BTCUSDT_1D", index=False)
+    return df
+
+
+def test_read_excel_cached_writes_and_reuses_parquet(tmp_path):
+    xlsx = tmp_path / "historical.xlsx"
+    _write_xlsx(xlsx, 5)
+
+    first = read_excel_cached(str(xlsx))
+    assert os.path.isdir(tmp_path / ".xlsx_cache" / "historical" / "sheet=BTCUSDT_1D")
+
+    second = read_excel_cached(str(xlsx))
+    assert list(second.columns) == ["timestamp", "open", "high", "low", "close", "volume"]
+    assert second.equals(first)
+
+
+def test_read_excel_cached_refreshes_when_xlsx_is_newer(tmp_path):
+    xlsx = tmp_path / "historical.xlsx"
+    _write_xlsx(xlsx, 5)
+    read_excel_cached(str(xlsx), sheet_name="BTCUSDT_1D")
+
+    time.sleep(0.05)
+    _write_xlsx(xlsx, 8)
+    assert len(read_excel_cached(str(xlsx), sheet_name="BTCUSDT_1D")) == 8
+
+
+def test_read_excel_cached_does_not_share_daily_parquet_dataset(tmp_path):
+    xlsx = tmp_path / "historical.xlsx"
+    dataset = tmp_path / "historical.parquet"
+    daily = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=3, freq="D", tz="UTC"),
+        "open": 9.0, "high": 9.0, "low": 9.0, "close": 9.0, "volume": 9.0,
+    })
+    save_df_to_parquet(daily, str(dataset), "BTCUSDT_1D")
+
+    time.sleep(0.05)
+    _write_xlsx(xlsx, 5)
+    time.sleep(0.05)
+    save_df_to_parquet(daily, str(dataset), "BTCUSDT_1D")  # daily job เขียนทีหลัง xlsx → ใหม่กว่า
+
+    assert len(read_excel_cached(str(xlsx), sheet_name="BTCUSDT_1D")) == 5
+    kept = pd.read_parquet(dataset / "sheet=BTCUSDT_1D")
+    assert len(kept) == 3 and str(kept["timestamp"].dt.tz) == "UTC"
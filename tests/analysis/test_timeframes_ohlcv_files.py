@@ -0,0 +1,77 @@
+# tests/analysis/test_timeframes_ohlcv_files.py
+# ไฟล์ที่ scripts/fetch_ohlcv.py เขียน (เวลากรุงเทพ) ต้องอ่านกลับผ่าน get_data เป็นเวลา UTC เดิม
+import os
+
+import pandas as pd
+
+import app.analysis.timeframes as tf_mod
+from archive_experiments.forward_test import load_price
+from jobs.forwardtest_live import read_last_date
+from scripts.fetch_ohlcv import _write_csv, save_merge_csv, save_merge_parquet
+
+
+def _fetched(n=3):
+    # รูปแบบเดียวกับ fetch_all_ohlcv: timestamp เป็นเวลากรุงเทพแบบ naive
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01 07:00", periods=n, freq="h"),
+        "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10.0,
+    })
+
+
+def _point_at(monkeypatch, csv_path):
+    monkeypatch.setattr(tf_mod, "_csv_candidates", lambda symbol, tf: [str(csv_path)])
+
+
+def test_parquet_from_fetch_reads_back_as_utc(tmp_path, monkeypatch):
+    csv = tmp_path / "BTCUSDT_1H.csv"
+    save_merge_parquet(_fetched(), os.path.splitext(csv)[0] + ".parquet")
+    save_merge_parquet(_fetched(5), os.path.splitext(csv)[0] + ".parquet")  # merge รอบสอง
+    _point_at(monkeypatch, csv)
+
+    df = tf_mod._read_csv_strict("BTCUSDT", "1H")
+    assert len(df) == 5
+    assert df["timestamp"].iloc[0] == pd.Timestamp("2024-01-01 00:00", tz="UTC")
+
+
+def test_csv_from_fetch_writer_reads_back_as_utc(tmp_path, monkeypatch):
+    csv = tmp_path / "BTCUSDT_1H.csv"
+    _write_csv(_fetched(), str(csv))
+    _write_csv(_fetched(5).iloc[3:], str(csv), append=True)
+    assert csv.read_text().splitlines()[0] == "timestamp,open,high,low,close,volume"
+    _point_at(monkeypatch, csv)
+
+    df = tf_mod._read_csv_strict("BTCUSDT", "1H")
+    assert len(df) == 5
+    assert df["timestamp"].iloc[0] == pd.Timestamp("2024-01-01 00:00", tz="UTC")
+    assert df["timestamp"].equals(
+        tf_mod._parse_and_clean_strict(pd.read_csv(csv))["timestamp"]
+    )
+
+
+def test_read_csv_fast_handles_quoted_header(tmp_path):
+    csv = tmp_path / "BTCUSDT_1H.csv"
+    csv.write_text(
+        '\ufeff"timestamp","open","high","low","close","volume"\n'
+        "2024-01-01 07:00:00,1,2,0.5,1.5,10\n",
+        encoding="utf-8",
+    )
+    raw = tf_mod._read_csv_fast(str(csv))
+    assert list(raw.columns) == ["timestamp", "open", "high", "low", "close", "volume"]
+    assert raw["timestamp"].iloc[0] == "2024-01-01 07:00:00"
+    assert tf_mod._parse_and_clean_strict(raw)["timestamp"].iloc[0] == pd.Timestamp("2024-01-01 00:00", tz="UTC")
+
+
+def test_forward_readers_agree_on_parquet_and_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetched = _fetched(20).assign(timestamp=lambda d: d["timestamp"] + pd.Timedelta(hours=10))
+    save_merge_csv(fetched, "data/BTCUSDT_1H.csv")
+    save_merge_parquet(fetched, "app/data/BTCUSDT_1H.parquet")
+
+    from_csv = load_price("BTCUSDT", "1H")  # data/ มาก่อน app/data/
+    os.remove("data/BTCUSDT_1H.csv")
+    from_parquet = load_price("BTCUSDT", "1H")
+
+    assert from_parquet["time"].equals(from_csv["time"])
+    assert from_csv["time"].iloc[0] == pd.Timestamp("2024-01-01 17:00")
+    # แท่งสุดท้าย 2024-01-02 12:00 (กรุงเทพ) = 05:00 UTC → วันที่ต้องเป็นวันกรุงเทพ
+    assert read_last_date("app/data/BTCUSDT_1H.parquet") == pd.Timestamp("2024-01-02").date()
@@ -31,3 +31,35 @@ def test_analyze_wave_includes_weekly_bias_in_message(monkeypatch):
     payload = wave_service.analyze_wave('BTCUSDT','1D')
     msg = wave_service.build_brief_message(payload)
     assert '[UP 1W]' in msg.splitlines()[0]
+
+
+def test_analyze_wave_uses_given_df_without_loading_main_tf(monkeypatch):
+    import pandas as pd, numpy as np, datetime as dt
+    from app.services import wave_service
+
+    n = 30
+    df = pd.DataFrame({
+        'timestamp': pd.date_range(end=dt.datetime(2025, 8, 25), periods=n, freq='D'),
+        'open':  np.linspace(100,110,n),
+        'high':  np.linspace(101,111,n),
+        'low':   np.linspace( 99,109,n),
+        'close': np.linspace(100,110,n),
+        'volume':np.linspace(1000,2000,n),
+    })
+    loaded = []
+
+    def _fake_get_data(symbol, tf, xlsx_path=None):
+        loaded.append(tf)
+        return pd.DataFrame()
+
+    seen = {}
+    def _fake_analyze_scenarios(df, symbol='BTCUSDT', tf='1D', cfg=None, weekly_ctx=None):
+        seen['df'] = df
+        return {'percent':{'up':50,'down':30,'side':20}, 'levels':{}, 'rationale':['fake'], 'meta':{'symbol':symbol,'tf':tf}}
+
+    monkeypatch.setattr(wave_service, 'get_data', _fake_get_data)
+    monkeypatch.setattr(wave_service, 'analyze_scenarios', _fake_analyze_scenarios)
+
+    wave_service.analyze_wave('BTCUSDT', '1D', df=df)
+    assert '1D' not in loaded
+    assert seen['df'] is df
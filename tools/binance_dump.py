@@ -10,11 +10,20 @@
 import sys, time, argparse
 from typing import Optional, List
 import requests
+import numpy as np
 import pandas as pd
 
 BASE_URL = "https://api.binance.com/api/v3/klines"
 LIMIT = 1000
 
+# layout ของ kline 12 คอลัมน์จาก Binance (typed ตั้งแต่ตอนเติม buffer)
+KLINE_DTYPE = np.dtype([
+    ("open_time", np.int64), ("open", np.float64), ("high", np.float64),
+    ("low", np.float64), ("close", np.float64), ("volume", np.float64),
+    ("close_time", np.int64), ("qav", np.float64), ("num_trades", np.int64),
+    ("tbbav", np.float64), ("tbqav", np.float64), ("ignore", np.float64),
+])
+
 def to_ms(date_str: Optional[str]) -> Optional[int]:
     if not date_str:
         return None
@@ -48,14 +57,13 @@ def download(symbol: str, interval: str, start_date: str, out_csv: str,
         print("⚠️ ไม่พบข้อมูลจาก Binance")
         pd.DataFrame(columns=["timestamp","open","high","low","close","volume"]).to_csv(out_csv, index=False)
         return
-    df = pd.DataFrame(all_rows, columns=[
-        "open_time","open","high","low","close","volume","close_time",
-        "qav","num_trades","tbbav","tbqav","ignore"
-    ])
-    df["timestamp"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    for c in ["open","high","low","close","volume"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df[["timestamp","open","high","low","close","volume"]].dropna().sort_values("timestamp")
+    rec = np.empty(len(all_rows), dtype=KLINE_DTYPE)
+    for i, r in enumerate(all_rows):
+        rec[i] = (int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5]),
+                  int(r[6]), float(r[7]), int(r[8]), float(r[9]), float(r[10]), float(r[11]))
+    df = pd.DataFrame.from_records(rec[["open_time","open","high","low","close","volume"]])
+    df.insert(0, "timestamp", pd.to_datetime(df.pop("open_time"), unit="ms", utc=True))
+    df = df.dropna().sort_values("timestamp")
     df.to_csv(out_csv, index=False)
     print(f"✅ saved {out_csv} rows={len(df)} range={df['timestamp'].min()} → {df['timestamp'].max()}")
 